@@ -1,40 +1,102 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import math
 import sqlite3
 import plotly.express as px
-from collections import defaultdict
-from config import items, packing_mode, boxes_pp_heading_name, amount_per_dozen
+from collections import defaultdict, OrderedDict
+from config import boxes_pp_heading_name, USE_DELIVERY_STORE
+import catalog
+import item_search
 from db import (
     init_db,
     create_dc_entry,
     fetch_dc_entry,
+    dc_archive_year,
     add_dc_delivery_details,
     get_dc_delivery_details,
     get_dc_cumulative_delivery_details,
     get_dc_delivery_details_with_date_filter,
+    get_item_totals_by_period,
+    get_item_history_summary,
+    get_item_history,
+    get_item_usage,
     update_dc_row,
     update_dc_delivery_entry,
     get_invoice_delivery_details,
     create_invoice,
     get_uncompleted_dcs,
     get_all_invoices,
+    invoice_exists,
+    get_invoices_overlapping,
+    reprice_invoices_if_needed,
+    ITEM_HISTORY_PAGE,
+    read_snapshot,
+    data_generation,
     delete_dc_delivery_entry,
     delete_dc_row,
-    delete_dc_entry
+    delete_dc_entry,
+    delete_dc_entries
 )
+from pdf_jobs import submit_pdf_job, get_pdf_job
+from invoice_pdf import prepare_invoice_df
+from invoice_html import render_invoice_html
+from batch_export import select_invoices, export_invoices_zip
+from delivery_export import deliveries_csv_bytes, deliveries_parquet_bytes
+import delivery_store
+from backup import start_backup_scheduler, backup_status
+import integrity
 import pandas as pd
-from datetime import datetime, date
+from io import BytesIO
+from datetime import datetime, date, timedelta
 
 # --- Wide Layout ---
 st.set_page_config(page_title="DC Management", layout="wide")
 
 # --- Initialize DB ---
 init_db()
+start_backup_scheduler()
+integrity.start_integrity_scheduler()
+if USE_DELIVERY_STORE:
+    delivery_store.warm_up()
+reprice_invoices_if_needed()
+if catalog.load_error():
+    st.warning(f"⚠️ The last change to the item catalog was not loaded: {catalog.load_error()}")
+last_backup, backup_error = backup_status()
+if backup_error:
+    last_ok = last_backup.strftime('%d-%m-%Y %H:%M') if last_backup else "never"
+    st.warning(f"⚠️ The scheduled backup at {backup_error[0].strftime('%d-%m-%Y %H:%M')} failed: "
+               f"{backup_error[1]} (newest snapshot: {last_ok})")
+
+# --- Live Data ---
+LIVE_REFRESH_SECONDS = 3
+# Results kept per loader (the most recently used arguments), so a session that searches many DCs,
+# ranges or items does not hold every result for its lifetime
+LIVE_CACHE_PER_LOADER = 2
+
+def live_read(loader, *args, tables):
+    """Call loader(*args) only when one of the tables changed since this session last read it."""
+    generation = data_generation(*tables)
+    cache = st.session_state.setdefault("live_cache", {}).setdefault(loader.__name__, OrderedDict())
+    entry = cache.get(args)
+    if entry is None or entry[0] != generation:
+        entry = (generation, loader(*args))
+        cache[args] = entry
+    cache.move_to_end(args)
+    while len(cache) > LIVE_CACHE_PER_LOADER:
+        cache.popitem(last=False)
+    return entry[1]
+
+# --- Catalog ---
+def warn_unpriced(frame):
+    # Items no longer in the catalog price at 0; say so rather than showing a silently short total
+    missing = catalog.unknown_items(frame["item"].unique())
+    if missing:
+        st.warning(f"⚠️ Not in the item catalog, priced at 0: {', '.join(missing)}")
 
 # --- Compute Boxes ---
 def compute_boxes(item, dozens):
     total_units = dozens * 12
-    return round(total_units / packing_mode.get(item, 1), 2)
+    return round(total_units / catalog.pieces_per_box(item, 1), 2)
 
 # --- Tabs ---
 tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
@@ -86,9 +148,9 @@ with tab1:
                             }
                             for row in row_data
                         ]
-                    )
+                    ).result()
                     st.success("✅ Saved successfully!")
-                    st.session_state.temp_rows = [{"item": items[0], "dozen": 1}]
+                    st.session_state.temp_rows = []
                     st.rerun()
                 except Exception as e:
                     st.error(f"❌ Error saving: {e}")
@@ -101,7 +163,7 @@ with tab1:
     dc_entry = st.text_input("DC_Entry_Number")
 
     if "temp_rows" not in st.session_state:
-        st.session_state.temp_rows = [{"item": items[0], "dozen": 1}]
+        st.session_state.temp_rows = []
 
     rows = st.session_state.temp_rows
     st.markdown("### 📝 Item Entries")
@@ -114,9 +176,10 @@ with tab1:
 
     rows_to_delete = []
 
+    # Rows carry only their item's name; items are chosen in the single picker below
     for i, row in enumerate(rows):
         cols = st.columns([2, 2, 2, 1])
-        row["item"] = cols[0].selectbox("Item", items, index=items.index(row["item"]), key=f"item_{i}", label_visibility="collapsed")
+        cols[0].text(row["item"])
         row["dozen"] = cols[1].number_input("dozen", min_value=1, value=row["dozen"], step=1, key=f"dozen_{i}", label_visibility="collapsed")
         
         boxes = compute_boxes(row["item"], row["dozen"])
@@ -130,8 +193,21 @@ with tab1:
             del rows[i]
         st.rerun()
 
-    if st.button("➕ Add Row"):
-        rows.append({"item": items[0], "dozen": 1})
+    # --- ITEM PICKER ---
+    # One search box and one short result list for the whole DC, ranked by recent use
+    usage = live_read(get_item_usage, tables=("dc_entries", "dc_rows"))
+    pick_cols = st.columns([3, 3, 1], vertical_alignment="bottom")
+    query = pick_cols[0].text_input("🔎 Find Item", key="item_query", placeholder="Part of the name, e.g. ss roo")
+    matches = item_search.search(query, usage)
+    if matches:
+        # No key: a new result list starts at its best match
+        picked = pick_cols[1].selectbox("Item", matches)
+    else:
+        picked = None
+        pick_cols[1].warning("⚠️ No item matches")
+
+    if pick_cols[2].button("➕ Add Row", disabled=picked is None):
+        rows.append({"item": picked, "dozen": 1})
         st.rerun()
 
     st.divider()
@@ -161,7 +237,7 @@ with tab2:
         col1, col2 = st.columns(2)
         if col1.button("✅ Confirm & Save", type="primary", use_container_width=True):
             try:
-                add_dc_delivery_details(dc_id, delivery_date, item_name, box_count)
+                add_dc_delivery_details(dc_id, delivery_date, item_name, box_count).result()
                 st.success("✅ Entry added successfully!")
                 st.rerun()
             except Exception as e:
@@ -169,6 +245,88 @@ with tab2:
         if col2.button("Cancel", use_container_width=True):
             st.rerun()
 
+    # --- LIVE VIEWS (refresh themselves only when the DC's data changes) ---
+    @st.fragment(run_every=LIVE_REFRESH_SECONDS)
+    def dc_status_view(search_dc):
+        dc_data, created_at = live_read(fetch_dc_entry, search_dc, tables=("dc_entries", "dc_rows"))
+        if not dc_data:
+            st.warning("❌ No entry found with that DC number.")
+            return
+
+        if created_at:
+            created_at_dt = datetime.fromisoformat(created_at)
+            st.info(f"📅 Created at: {created_at_dt.strftime('%d-%m-%Y %H:%M:%S')}")
+
+        df = pd.DataFrame(dc_data)
+        df.insert(0, "Sl.no", range(1, len(df) + 1))
+
+        delivered_df = live_read(get_dc_cumulative_delivery_details, search_dc, tables=("dc_delivery_details",))
+        df = df.merge(delivered_df, on="Item", how="left")
+        df["total_delivered"] = df["total_delivered"].fillna(0)
+        df["is_delivery_completed"] = df["total_delivered"] >= df["Boxes"]
+        df["is_delivery_completed"] = df["is_delivery_completed"].map({True: "✅", False: "❌"})
+
+        styled_df = df.style.set_properties(
+            subset=["is_delivery_completed"], **{"text-align": "center", "font-weight": "bold"}
+        ).format({
+            "total_delivered": "{:.2f}",
+            "Boxes": "{:.2f}"
+        }) 
+
+        all_delivered = df["is_delivery_completed"].eq("✅").all()
+        status_icon = "✅ Completed" if all_delivered else "❌ Not Completed"
+
+        st.markdown(f"### DC Number: `{search_dc}` {status_icon}")
+        st.dataframe(styled_df, hide_index=True, use_container_width=True)
+
+    @st.fragment(run_every=LIVE_REFRESH_SECONDS)
+    def dc_delivery_summary_view(search_dc):
+        # ========== DELIVERY SUMMARY SECTION WITH INVOICE MAPPING ==========
+        with st.expander("Existing Delivery Details of the DC"):
+            st.markdown("### 📦 Delivery Summary for DC: `" + search_dc + "`") 
+            summary_df = live_read(get_dc_delivery_details, search_dc, tables=("dc_delivery_details",))
+            
+            if not summary_df.empty:
+                # Fetch all invoices (Now includes from_date and to_date)
+                all_invoices = live_read(get_all_invoices, tables=("invoices",))
+                
+                def find_invoice(row_date_str):
+                    if not all_invoices:
+                        return "N/A"
+                    
+                    try:
+                        # row_date is string "YYYY-MM-DD" from DB
+                        row_dt = datetime.strptime(row_date_str, "%Y-%m-%d").date()
+                    except:
+                        return "N/A"
+
+                    for inv in all_invoices:
+                        # Parse invoice range
+                        try:
+                            inv_from = datetime.fromisoformat(inv['from_date']).date()
+                            inv_to = datetime.fromisoformat(inv['to_date']).date()
+                            
+                            if inv_from <= row_dt <= inv_to:
+                                return inv['invoice_number']
+                        except:
+                            continue
+                    return "N/A"
+
+                # Apply matching logic (on a new frame, the cached one is reused on later refreshes)
+                summary_df = summary_df.drop(columns="delivery_id")
+                summary_df = summary_df.assign(**{"Invoice No": summary_df["date"].apply(find_invoice)})
+                
+                # Reorder: Sl.No, Date, Invoice No, Item_Name, Delivered_Boxes
+                cols = summary_df.columns.tolist()
+                if "Invoice No" in cols:
+                    # Move Invoice No to the 2nd position
+                    cols.insert(1, cols.pop(cols.index("Invoice No")))
+                    summary_df = summary_df[cols]
+
+                st.dataframe(summary_df, hide_index=True, use_container_width=True)
+            else:
+                st.info("No delivery entries found for this DC.")
+
     # --- SEARCH UI ---
     dc_input = st.text_input("Enter DC_Entry_Number to view:")
 
@@ -177,37 +335,11 @@ with tab2:
 
     if "search_dc" in st.session_state and st.session_state.search_dc:  
         search_dc = st.session_state.search_dc 
-        dc_data, created_at = fetch_dc_entry(search_dc)
-        
-        if not dc_data:
-            st.warning("❌ No entry found with that DC number.")
-        else:
-            if created_at:
-                created_at_dt = datetime.fromisoformat(created_at)
-                st.info(f"📅 Created at: {created_at_dt.strftime('%d-%m-%Y %H:%M:%S')}")
-            
-            df = pd.DataFrame(dc_data)
-            df.insert(0, "Sl.no", range(1, len(df) + 1))
-
-            delivered_df = get_dc_cumulative_delivery_details(search_dc)
-            df = df.merge(delivered_df, on="Item", how="left")
-            df["total_delivered"] = df["total_delivered"].fillna(0)
-            df["is_delivery_completed"] = df["total_delivered"] >= df["Boxes"]
-            df["is_delivery_completed"] = df["is_delivery_completed"].map({True: "✅", False: "❌"})
-
-            styled_df = df.style.set_properties(
-                subset=["is_delivery_completed"], **{"text-align": "center", "font-weight": "bold"}
-            ).format({
-                "total_delivered": "{:.2f}",
-                "Boxes": "{:.2f}"
-            }) 
-
-            all_delivered = df["is_delivery_completed"].eq("✅").all()
-            status_icon = "✅ Completed" if all_delivered else "❌ Not Completed"
+        dc_data, created_at = live_read(fetch_dc_entry, search_dc, tables=("dc_entries", "dc_rows"))
 
-            st.markdown(f"### DC Number: `{search_dc}` {status_icon}")
-            st.dataframe(styled_df, hide_index=True, use_container_width=True)
+        dc_status_view(search_dc)
 
+        if dc_data:
             # ========== ADD DELIVERY SECTION ==========
             with st.expander("Add Delivery Details to This DC"):
                 st.markdown("### Add Delivery Details to This DC")
@@ -228,50 +360,7 @@ with tab2:
                     if submitted:
                         confirm_delivery_dialog(search_dc, date_val, item_val, boxes_val)
 
-            # ========== DELIVERY SUMMARY SECTION WITH INVOICE MAPPING ==========
-            with st.expander("Existing Delivery Details of the DC"):
-                st.markdown("### 📦 Delivery Summary for DC: `" + search_dc + "`") 
-                summary_df = get_dc_delivery_details(search_dc)
-                
-                if not summary_df.empty:
-                    # Fetch all invoices (Now includes from_date and to_date)
-                    all_invoices = get_all_invoices() 
-                    
-                    def find_invoice(row_date_str):
-                        if not all_invoices:
-                            return "N/A"
-                        
-                        try:
-                            # row_date is string "YYYY-MM-DD" from DB
-                            row_dt = datetime.strptime(row_date_str, "%Y-%m-%d").date()
-                        except:
-                            return "N/A"
-
-                        for inv in all_invoices:
-                            # Parse invoice range
-                            try:
-                                inv_from = datetime.fromisoformat(inv['from_date']).date()
-                                inv_to = datetime.fromisoformat(inv['to_date']).date()
-                                
-                                if inv_from <= row_dt <= inv_to:
-                                    return inv['invoice_number']
-                            except:
-                                continue
-                        return "N/A"
-
-                    # Apply matching logic
-                    summary_df["Invoice No"] = summary_df["date"].apply(find_invoice)
-                    
-                    # Reorder: Sl.No, Date, Invoice No, Item_Name, Delivered_Boxes
-                    cols = summary_df.columns.tolist()
-                    if "Invoice No" in cols:
-                        # Move Invoice No to the 2nd position
-                        cols.insert(1, cols.pop(cols.index("Invoice No")))
-                        summary_df = summary_df[cols]
-
-                    st.dataframe(summary_df, hide_index=True, use_container_width=True)
-                else:
-                    st.info("No delivery entries found for this DC.")
+            dc_delivery_summary_view(search_dc)
 
 # ============== TAB 3: UPDATE DC DETAILS ==============
 # ============== TAB 3: UPDATE DC DETAILS ==============
@@ -286,22 +375,42 @@ with tab3:
         if col1.button("Yes, Delete Everything", type="primary", use_container_width=True):
             dc_row_data, created_at = fetch_dc_entry(dc_id)
             if dc_row_data:
-                delete_dc_entry(dc_id)
-                st.session_state.update_dc = None
-                st.success("✅ DC Deleted Successfully")
-                st.rerun()
+                try:
+                    delete_dc_entry(dc_id).result()
+                    st.session_state.update_dc = None
+                    st.success("✅ DC Deleted Successfully")
+                    st.rerun()
+                except ValueError as e:
+                    st.error(f"❌ {e}")
             else:
                 st.error("❌ No DC found.")
         if col2.button("Cancel", use_container_width=True):
             st.rerun()
 
+    @st.dialog("Confirm Bulk Deletion")
+    def confirm_delete_many_dialog(dc_numbers, created_from, created_to):
+        scope = []
+        if dc_numbers:
+            scope.append(f"DCs **{', '.join(dc_numbers)}**")
+        if created_from:
+            scope.append(f"every DC created from **{created_from}** to **{created_to}**")
+        st.warning(f"⚠️ DELETE {' and '.join(scope)}, with all their items and deliveries? This action cannot be undone.")
+        col1, col2 = st.columns(2)
+        if col1.button("Yes, Delete Them", type="primary", use_container_width=True):
+            counts = delete_dc_entries(dc_numbers, created_from, created_to).result()
+            st.session_state.update_dc = None
+            st.success(f"✅ Deleted {counts['dc_entries']} DCs, {counts['dc_rows']} items and "
+                       f"{counts['dc_delivery_details']} deliveries.")
+        if col2.button("Close", use_container_width=True):
+            st.rerun()
+
     @st.dialog("Delete Item from DC")
     def confirm_delete_item_dialog(dc_id, item_name):
         st.warning(f"⚠️ Confirm deletion of item **{item_name}** from this DC?")
         col1, col2 = st.columns(2)
         if col1.button("Yes, Delete Item", type="primary", use_container_width=True):
             try:
-                delete_dc_row(dc_id, item_name)
+                delete_dc_row(dc_id, item_name).result()
                 st.success(f"✅ Deleted item '{item_name}'")
                 st.rerun()
             except Exception as e:
@@ -310,12 +419,12 @@ with tab3:
             st.rerun()
 
     @st.dialog("Delete Delivery Record")
-    def confirm_delete_delivery_dialog(dc_id, date_obj, item_name):
+    def confirm_delete_delivery_dialog(dc_id, delivery_id, date_obj, item_name):
         st.warning(f"⚠️ Delete delivery record: **{item_name}** on **{date_obj}**?")
         col1, col2 = st.columns(2)
         if col1.button("Yes, Delete Record", type="primary", use_container_width=True):
             try:
-                delete_dc_delivery_entry(dc_id, date_obj, item_name)
+                delete_dc_delivery_entry(dc_id, delivery_id).result()
                 st.success("✅ Delivery record deleted.")
                 st.rerun()
             except Exception as e:
@@ -323,6 +432,25 @@ with tab3:
         if col2.button("Cancel", use_container_width=True):
             st.rerun()
 
+    # --- DATA CHECKS ---
+    last_scan, issues = live_read(integrity.latest_report, tables=("integrity_issues",))
+    checks_title = f"🩺 Data Checks ({len(issues)} problems)" if issues else "🩺 Data Checks"
+    with st.expander(checks_title, expanded=bool(issues)):
+        if last_scan is None:
+            st.info("The data has not been checked yet.")
+        else:
+            st.caption(f"Last checked {last_scan.strftime('%d-%m-%Y %H:%M')}")
+            if issues:
+                issues_df = pd.DataFrame(issues, columns=["Check", "DC No", "Item", "Details"])
+                issues_df["Check"] = issues_df["Check"].map(integrity.CHECK_TITLES)
+                st.dataframe(issues_df, hide_index=True, use_container_width=True)
+            else:
+                st.success("✅ No problems found.")
+        if st.button("🔄 Check Now"):
+            with st.spinner("Checking..."):
+                integrity.scan_now()
+            st.rerun()
+
     # --- MAIN UI ---
     update_dc = st.text_input("Enter DC_Entry_Number to update")
     col_load, col_delete = st.columns([4, 1])
@@ -332,17 +460,38 @@ with tab3:
             st.session_state.update_dc = update_dc
 
     with col_delete:
-        if st.button("🗑️ Delete DC"):
+        if st.button("🗑️ Delete DC", disabled=bool(update_dc) and dc_archive_year(update_dc) is not None):
             if update_dc != "":
                 confirm_delete_dc_dialog(update_dc)
 
+    with st.expander("🗑️ Delete Several DCs"):
+        bulk_numbers = st.text_area("DC_Entry_Numbers (separated by commas, spaces or new lines)")
+        by_created = st.checkbox("Also delete every DC created between")
+        bulk_cols = st.columns(2)
+        bulk_from = bulk_cols[0].date_input("Created From", disabled=not by_created, key="bulk_from")
+        bulk_to = bulk_cols[1].date_input("Created To", disabled=not by_created, key="bulk_to")
+        if st.button("🗑️ Delete These DCs"):
+            dc_numbers = [n for n in bulk_numbers.replace(",", " ").split() if n]
+            if not dc_numbers and not by_created:
+                st.error("⚠️ Enter DC numbers or choose a date range.")
+            elif by_created and bulk_from > bulk_to:
+                st.error("❌ 'Created From' cannot be after 'Created To'")
+            else:
+                confirm_delete_many_dialog(dc_numbers, bulk_from if by_created else None,
+                                           bulk_to if by_created else None)
+
     # ---------- LOAD DC ----------
     if "update_dc" in st.session_state and st.session_state.update_dc:
         update_dc = st.session_state.update_dc
         # dc_row_data contains the Master/Planned records
         dc_row_data, created_at = fetch_dc_entry(update_dc)
+        # Archived DCs are shown for reference only; their rows and deliveries cannot be changed
+        archive_year = dc_archive_year(update_dc)
+        read_only = archive_year is not None
 
         if dc_row_data:
+            if read_only:
+                st.info(f"🗄️ DC {update_dc} is archived ({archive_year}) and is read-only.")
             with st.expander("🗃 Update Master Row (Planned Quantities)", expanded=True):
                 row_df = pd.DataFrame(dc_row_data)
                 st.write("Current Planned Totals:")
@@ -354,23 +503,24 @@ with tab3:
 
                 col1, col2 = st.columns(2)
                 with col1:
-                    new_dozen = st.number_input("New Dozen", min_value=0, step=1, value=int(selected_row["Dozen"]))
+                    new_dozen = st.number_input("New Dozen", min_value=0, step=1, value=int(selected_row["Dozen"]),
+                                                disabled=read_only)
                 with col2:
                     new_boxes = compute_boxes(selected_item, new_dozen)
                     st.number_input("New calculated boxes", value=new_boxes, disabled=True)
 
                 col_upd, col_del = st.columns([4, 1])
                 with col_upd:
-                    if st.button("💾 Update Planned Quantity"):
+                    if st.button("💾 Update Planned Quantity", disabled=read_only):
                         try:
-                            update_dc_row(update_dc, selected_item, new_dozen, new_boxes)
+                            update_dc_row(update_dc, selected_item, new_dozen, new_boxes).result()
                             st.success(f"✅ Master row updated.")
                             st.rerun()
                         except Exception as e:
                             st.error(f"❌ Error: {e}")
 
                 with col_del:
-                    if st.button("🗑️ Delete Item"):
+                    if st.button("🗑️ Delete Item", disabled=read_only):
                         confirm_delete_item_dialog(update_dc, selected_item)
 
             st.markdown("---")
@@ -379,11 +529,15 @@ with tab3:
             with st.expander("🚚 Update Specific Delivery Entry (Delivery History)"):
                 delivery_df = get_dc_delivery_details(update_dc)
                 if not delivery_df.empty:
-                    st.dataframe(delivery_df, use_container_width=True, hide_index=True)
-                    delivery_df["selection_label"] = delivery_df["date"] + " | " + delivery_df["Item_Name"]
-                    selected_label = st.selectbox("Select Delivery Record", delivery_df["selection_label"])
-                    
-                    target_row = delivery_df[delivery_df["selection_label"] == selected_label].iloc[0]
+                    st.dataframe(delivery_df.drop(columns="delivery_id"), use_container_width=True, hide_index=True)
+                    # Records are picked by delivery_id, so two deliveries of an item on the same day stay apart
+                    records = delivery_df.set_index("delivery_id", drop=False)
+                    selected_id = st.selectbox(
+                        "Select Delivery Record", records.index,
+                        format_func=lambda d: f"{records.at[d, 'date']} | {records.at[d, 'Item_Name']} | {records.at[d, 'Delivered_Boxes']:.2f}"
+                    )
+
+                    target_row = records.loc[selected_id]
                     old_date_str = target_row["date"]
                     selected_item_name = target_row["Item_Name"]
                     old_box_val = float(target_row["Delivered_Boxes"])
@@ -395,38 +549,70 @@ with tab3:
 
                     col1, col2 = st.columns(2)
                     with col1:
-                        new_box_val = st.number_input("Update Boxes", min_value=0.0, value=old_box_val)
+                        new_box_val = st.number_input("Update Boxes", min_value=0.0, value=old_box_val,
+                                                      disabled=read_only)
                         
                         # Show Warning if delivered > planned
                         if new_box_val > planned_boxes:
                             st.warning(f"⚠️ Warning: Delivered boxes ({new_box_val}) exceed Planned boxes ({planned_boxes})")
 
                     with col2:
-                        change_date = st.checkbox("Change Date?")
+                        change_date = st.checkbox("Change Date?", disabled=read_only)
                         new_date = st.date_input("New Date", value=old_date_obj) if change_date else None
 
                     col_upd, col_del = st.columns([4, 1])
                     with col_upd:
-                        if st.button("💾 Update Record"):
+                        if st.button("💾 Update Record", disabled=read_only):
                             # Block the update if it exceeds planned total
                             if new_box_val > planned_boxes:
                                 st.error(f"❌ Cannot update: Delivered quantity ({new_box_val}) cannot exceed Planned quantity ({planned_boxes}).")
                             else:
                                 try:
-                                    update_dc_delivery_entry(update_dc, old_date_obj, selected_item_name, new_box_val, new_date)
+                                    update_dc_delivery_entry(update_dc, int(selected_id), new_box_val, new_date).result()
                                     st.success("✅ Delivery updated.")
                                     st.rerun()
                                 except Exception as e:
                                     st.error(f"❌ Update failed: {e}")
 
                     with col_del:
-                        if st.button("🗑️ Delete Record"):
-                            confirm_delete_delivery_dialog(update_dc, old_date_obj, selected_item_name)
+                        if st.button("🗑️ Delete Record", disabled=read_only):
+                            confirm_delete_delivery_dialog(update_dc, int(selected_id), old_date_obj, selected_item_name)
                 else:
                     st.info("No delivery records found.")
         else:
             st.warning("❌ No DC found.")
 # ============== TAB 4: Create Invoice Details ==============
+def invoice_preview(from_date, to_date, catalog_version):
+    """Priced deliveries in the range, their totals, and the saved invoices that share dates with it."""
+    # Cached per (range, data generation, catalog version) through live_read, so typing the invoice
+    # number reruns the page without re-reading or re-pricing anything. The reads share one pinned
+    # read-only snapshot so they never stall data entry.
+    with read_snapshot():
+        df = get_dc_delivery_details_with_date_filter(from_date, to_date)
+        overlapping = get_invoices_overlapping(from_date, to_date)
+
+    # Priced exactly as the bill will be (per-line rounding), so the preview total is the invoice total
+    pieces, dozens, _, amount = catalog.invoice_lines(df["boxes"], df["item"])
+    df["Packing Mode"] = pieces
+    df["Dozens"] = dozens
+
+    # Deliveries a saved invoice already covers (the first one, if several do)
+    covered = pd.Series(None, index=df.index, dtype="object")
+    for invoice_number, inv_from, inv_to in overlapping:
+        in_invoice = df["date"].between(pd.Timestamp(inv_from), pd.Timestamp(inv_to)) & covered.isna()
+        covered[in_invoice] = invoice_number
+    df["Already Invoiced"] = covered
+
+    totals = {
+        "lines": len(df),
+        "boxes": df["boxes"].sum(),
+        "dozens": round(float(dozens.sum()), 2),
+        "amount": int(amount.sum()),
+        "covered": int(covered.notna().sum()),
+    }
+    return df, totals, overlapping
+
+
 with tab4:
     st.title("🧾 Create Invoice Details")
 
@@ -441,26 +627,34 @@ with tab4:
     if from_date > to_date:
         st.error("❌ 'From Date' cannot be after 'To Date'")
     else:
-        df = get_dc_delivery_details_with_date_filter(from_date, to_date)
+        df, totals, overlapping = live_read(invoice_preview, from_date, to_date, catalog.catalog().version,
+                                            tables=("dc_delivery_details", "invoices"))
         if df.empty:
             st.warning("⚠️ No delivery entries found for this date range.")
         else:
-            # 🔹 Add Packing Mode
-            df["Packing Mode"] = df["item"].apply(lambda x: packing_mode.get(x, 0))
-
-            # 🔹 Add Dozens = (Boxes × Packing Mode) / 12
-            df["Dozens"] = df.apply(
-                lambda row: (row["boxes"] * packing_mode.get(row["item"], 0)) / 12, axis=1
-            )
-
-            st.dataframe(df, hide_index=True, use_container_width=True)
+            warn_unpriced(df)
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Deliveries", totals["lines"])
+            m2.metric("Total Boxes", f"{totals['boxes']:.2f}")
+            m3.metric("Total Dozens", f"{totals['dozens']:.2f}")
+            m4.metric("Total Amount", f"₹{totals['amount']:,.2f}")
+            if totals["covered"]:
+                st.warning(f"⚠️ {totals['covered']} of these deliveries are already in saved invoices: "
+                           f"{', '.join(number for number, _, _ in overlapping)} (see 'Already Invoiced').")
+
+            st.dataframe(df, hide_index=True, use_container_width=True,
+                         column_config={"date": st.column_config.DateColumn(format="DD-MM-YYYY")})
             invoice_no = st.text_input("📦 Invoice Number (e.g., INV_001)")
-            if st.button("✅ Create Invoice"):
+            # A primary-key lookup, so checking on every keystroke costs next to nothing
+            taken = bool(invoice_no.strip()) and invoice_exists(invoice_no.strip())
+            if taken:
+                st.error(f"❌ Invoice '{invoice_no.strip()}' already exists!")
+            if st.button("✅ Create Invoice", disabled=taken):
                 if not invoice_no.strip():
                     st.error("❌ Invoice number cannot be empty")
                 else:
                     try:
-                        create_invoice(invoice_no.strip(), from_date, to_date)
+                        create_invoice(invoice_no.strip(), from_date, to_date).result()
                         st.success(f"✅ Invoice '{invoice_no}' created!")
                     except sqlite3.IntegrityError:
                         st.error(f"❌ Invoice '{invoice_no}' already exists!")
@@ -485,21 +679,16 @@ with tab5:
                 df.insert(0, "Sl.no", range(1, len(df) + 1))
 
                 # 🔹 Add Packing Mode
-                df["Packing Mode"] = df["item"].apply(lambda x: packing_mode.get(x, 0))
+                warn_unpriced(df)
+                pieces, rates = catalog.pricing(df["item"])
+                df["Packing Mode"] = pieces
 
                 # 🔹 Add Dozens (rounded to 2 decimals)
-                df["Dozens"] = df.apply(
-                    lambda row: (row["boxes"] * packing_mode.get(row["item"], 0)) / 12, axis=1
-                ).round(2)
-
-                # Compute Amount using packing_mode & amount_per_dozen
-                def compute_amount(row):
-                    pieces = row["boxes"] * packing_mode.get(row["item"], 0)   # total pieces
-                    dozens = pieces / 12                                       # convert to dozens
-                    rate = amount_per_dozen.get(row["item"], 0)                # rate per dozen
-                    return dozens * rate
+                dozens = df["boxes"] * df["Packing Mode"] / 12
+                df["Dozens"] = dozens.round(2)
 
-                df["Amount"] = df.apply(compute_amount, axis=1)
+                # Compute Amount from the catalog rate (on the unrounded dozens)
+                df["Amount"] = dozens * rates
 
                 # Format nicely
                 styled_df = df.style.format({
@@ -508,55 +697,121 @@ with tab5:
                     "Dozens": "{:.2f}"
                 })
 
-                st.dataframe(styled_df, hide_index=True, use_container_width=True)
+                st.dataframe(styled_df, hide_index=True, use_container_width=True,
+                             column_config={"date": st.column_config.DateColumn(format="DD-MM-YYYY")})
 
                 # Show Total Amount at bottom
                 total_amount = df["Amount"].sum()
                 st.subheader(f"💰 Total Invoice Amount: ₹{total_amount:,.2f}")
 
 
+# DC age buckets, in days since the DC was created: (label, upper bound), youngest first
+AGE_BUCKETS = [("0-7 days", 7), ("8-15 days", 15), ("16-30 days", 30), ("31-60 days", 60), ("Over 60 days", None)]
+
+def pending_workload(today, catalog_version):
+    """
+    Pending boxes and dozens by DC age, by packing mode and by item, oldest first, plus overall
+    totals. One vectorized pass over the (already cached) pending rows; no per-DC loop.
+    """
+    pending = live_read(get_uncompleted_dcs, tables=("dc_entries", "dc_rows", "dc_delivery_details"))
+    work = pd.DataFrame({
+        "dc_entry_number": pending["dc_entry_number"],
+        "item": pending["item"],
+        "created_at": pending["created_at"],
+        "Boxes": pending["planned_boxes"] - pending["delivered_boxes"],
+    })
+    work["Packing Mode"], _ = catalog.pricing(work["item"])
+    work["Dozens"] = work["Boxes"] * work["Packing Mode"] / 12
+    age_days = (pd.Timestamp(today) - work["created_at"].dt.normalize()).dt.days
+    bounds = [-math.inf] + [bound for _, bound in AGE_BUCKETS[:-1]] + [math.inf]
+    work["DC Age"] = pd.cut(age_days, bins=bounds, labels=[label for label, _ in AGE_BUCKETS])
+
+    def rollup(by, ascending=True):
+        frame = work.groupby(by, observed=True).agg(
+            DCs=("dc_entry_number", "nunique"),
+            Boxes=("Boxes", "sum"),
+            Dozens=("Dozens", "sum"),
+            Oldest=("created_at", "min"),
+        ).reset_index()
+        return frame.sort_values("Oldest", ascending=ascending, kind="stable")
+
+    totals = {
+        "dcs": work["dc_entry_number"].nunique(),
+        "boxes": work["Boxes"].sum(),
+        "dozens": work["Dozens"].sum(),
+        "oldest_days": int(age_days.max()) if len(work) else 0,
+    }
+    # Age buckets in bucket order, oldest bucket first; modes and items by their oldest pending DC
+    by_age = rollup("DC Age").sort_values("DC Age", ascending=False)
+    return totals, by_age, rollup("Packing Mode"), rollup("item").rename(columns={"item": "Item"})
+
 with tab6:
     st.title("🕒 Pending DC Details")
 
-    uncompleted_df = get_uncompleted_dcs()
+    # Refreshes itself only when DCs or deliveries change; idle ticks are served from the session cache
+    @st.fragment(run_every=LIVE_REFRESH_SECONDS)
+    def pending_dcs_view():
+        uncompleted_df = live_read(get_uncompleted_dcs, tables=("dc_entries", "dc_rows", "dc_delivery_details"))
 
-    if uncompleted_df.empty:
-        st.success("🎉 All DCs are completed!")
-    else:
-        # Group by DC number
-        for dc_num, group in uncompleted_df.groupby("dc_entry_number"):
-            with st.expander(f"📋 DC Number: {dc_num} (Pending Items: {len(group)})"):
-                # Add Sl.no
-                group = group.reset_index(drop=True)
-                group.insert(0, "Sl.no", range(1, len(group) + 1))
-
-                if not group.empty:
-                    created_at_value = group.iloc[0, -1]  # first row, last column
-                    
-                    if pd.notna(created_at_value):
-                        created_at_dt = pd.to_datetime(created_at_value)
-                        st.info(f"📅 Created at: {created_at_dt.strftime('%d-%m-%Y %H:%M:%S')}")
+        if uncompleted_df.empty:
+            st.success("🎉 All DCs are completed!")
+        else:
+            # ---------- PENDING WORKLOAD ----------
+            st.markdown("### 📊 Pending Workload")
+            totals, by_age, by_mode, by_item = live_read(
+                pending_workload, date.today(), catalog.catalog().version,
+                tables=("dc_entries", "dc_rows", "dc_delivery_details"))
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Pending DCs", totals["dcs"])
+            m2.metric("Pending Boxes", f"{totals['boxes']:,.2f}")
+            m3.metric("Pending Dozens", f"{totals['dozens']:,.2f}")
+            m4.metric("Oldest Pending DC", f"{totals['oldest_days']} days")
+
+            workload_format = {"Boxes": "{:,.2f}", "Dozens": "{:,.2f}"}
+            workload_columns = {"Oldest": st.column_config.DatetimeColumn("Oldest DC", format="DD-MM-YYYY")}
+            age_tab, mode_tab, item_tab = st.tabs(["By DC Age", "By Packing Mode", "By Item"])
+            for workload_tab, frame in ((age_tab, by_age), (mode_tab, by_mode), (item_tab, by_item)):
+                with workload_tab:
+                    st.dataframe(frame.style.format(workload_format), hide_index=True,
+                                 use_container_width=True, column_config=workload_columns)
+
+            st.markdown("### 📋 Pending Items by DC")
+            # Group by DC number
+            for dc_num, group in uncompleted_df.groupby("dc_entry_number", observed=True):
+                with st.expander(f"📋 DC Number: {dc_num} (Pending Items: {len(group)})"):
+                    # Add Sl.no
+                    group = group.reset_index(drop=True)
+                    group.insert(0, "Sl.no", range(1, len(group) + 1))
+
+                    if not group.empty:
+                        created_at_value = group.iloc[0, -1]  # first row, last column
+                        
+                        if pd.notna(created_at_value):
+                            created_at_dt = pd.to_datetime(created_at_value)
+                            st.info(f"📅 Created at: {created_at_dt.strftime('%d-%m-%Y %H:%M:%S')}")
 
-                group = group.iloc[:, :-1]
+                    group = group.iloc[:, :-1]
 
-                # Add Pending Boxes column
-                group["pending_boxes"] = group["planned_boxes"] - group["delivered_boxes"]
+                    # Add Pending Boxes column
+                    group["pending_boxes"] = group["planned_boxes"] - group["delivered_boxes"]
 
-                group["pieces_per_box"] = group["item"].map(packing_mode).fillna(0)
+                    group["pieces_per_box"], _ = catalog.pricing(group["item"])
 
-                group["pending_dozens"] = (group["pending_boxes"] * group["pieces_per_box"]) / 12
+                    group["pending_dozens"] = (group["pending_boxes"] * group["pieces_per_box"]) / 12
 
-                group.drop(columns=["pieces_per_box"], inplace=True)
+                    group.drop(columns=["pieces_per_box"], inplace=True)
 
-                # Display with formatting
-                styled_group = group.style.format({
-                    "planned_boxes": "{:.2f}",
-                    "delivered_boxes": "{:.2f}",
-                    "pending_boxes": "{:.2f}",
-                    "pending_dozens": "{:.2f}"
-                })
+                    # Display with formatting
+                    styled_group = group.style.format({
+                        "planned_boxes": "{:.2f}",
+                        "delivered_boxes": "{:.2f}",
+                        "pending_boxes": "{:.2f}",
+                        "pending_dozens": "{:.2f}"
+                    })
+
+                    st.dataframe(styled_group, hide_index=True, use_container_width=True)
 
-                st.dataframe(styled_group, hide_index=True, use_container_width=True)
+    pending_dcs_view()
 
 # ================= TAB 7: PRINT OUT =================
 # ================= TAB 7: PRINT OUT =================
@@ -565,7 +820,42 @@ with tab6:
 with tab7:
     st.title("🖨️ Print Invoice")
 
-    invoice_numbers = [inv['invoice_number'] for inv in get_all_invoices()]
+    # --- BACKGROUND PDF JOB DISPLAY ---
+    @st.fragment(run_every=1)
+    def poll_pdf_job(job_id):
+        job = get_pdf_job(job_id)
+        if job is None or job["status"] not in ("queued", "running"):
+            st.rerun()
+        st.progress(job["progress"], text=f"⏳ Generating PDF for invoice {job['invoice_number']}...")
+
+    def show_pdf_job_result(job, invoice_number):
+        if job is None:
+            st.info("ℹ️ The PDF for this invoice has expired. Click Save as PDF again.")
+        elif job["status"] == "failed":
+            st.error(f"❌ PDF generation failed: {job['error']}")
+        else:
+            st.success("✅ PDF generated successfully")
+            st.download_button(
+                label="⬇️ Download Invoice PDF",
+                data=job["result"],
+                file_name=f"{invoice_number}.pdf",
+                mime="application/pdf"
+            )
+
+    all_invoices = live_read(get_all_invoices, tables=("invoices",))
+    invoice_numbers = [inv['invoice_number'] for inv in all_invoices]
+    if all_invoices:
+        with st.expander("📒 Invoice Register"):
+            # Totals are stored on each invoice and kept current as its deliveries change
+            register = pd.DataFrame(all_invoices).rename(columns={
+                "invoice_number": "Invoice", "from_date": "From", "to_date": "To", "created_at": "Created",
+                "line_count": "Lines", "total_boxes": "Boxes", "total_dozens": "Dozens", "total_amount": "Amount (₹)",
+            })
+            st.dataframe(register, hide_index=True, use_container_width=True, column_config={
+                "Boxes": st.column_config.NumberColumn(format="%.2f"),
+                "Dozens": st.column_config.NumberColumn(format="%.2f"),
+                "Amount (₹)": st.column_config.NumberColumn(format="%.2f"),
+            })
     if not invoice_numbers:
         st.info("⚠️ No invoices available to print.")
     else:
@@ -576,197 +866,122 @@ with tab7:
             if from_date is None or df.empty:
                 st.warning("⚠️ No invoice found or no data available for this invoice.")
             else:
-                # --- Prepare dataframe fields ---
-                invoice_date_str = created_at.strftime("%d-%m-%Y")
-                df.insert(0, "Sl.no", range(1, len(df) + 1))
-
-                # Compute Packing Mode, Dozens, Rate, Amount
-                df["Pack Mode"] = df["item"].apply(lambda x: packing_mode.get(x, 0))
-                df["Dozens"] = df.apply(lambda row: round((row["boxes"] * packing_mode.get(row["item"], 0)) / 12, 2), axis=1)
-                df["Rate"] = df["item"].apply(lambda x: amount_per_dozen.get(x, 0))
-                df["Amount"] = (df["Dozens"] * df["Rate"]).round(0).astype(int)
-
-                # Units: convert to int when whole numbers (remove .0)
-                def display_units(u):
-                    try:
-                        if isinstance(u, float) and u.is_integer():
-                            return int(u)
-                        return u
-                    except:
-                        return u
-                df["Units"] = df["boxes"].apply(lambda x: display_units(x))
-
-                # Rename for print
-                df.rename(columns={
-                    "dc_entry_number": "DC No",
-                    "date": "Date",
-                    "item": "Particular"
-                }, inplace=True)
-
-                print_cols = ["Sl.no", "DC No", "Date", "Pack Mode", "Units", "Particular", "Dozens", "Rate", "Amount"]
+                export_format = st.radio("Export format", ["PDF", "HTML (browser print)"], horizontal=True)
+
+                if export_format == "PDF":
+                    # Render in the background so the rest of the app stays usable; the job survives reruns
+                    if "pdf_jobs" not in st.session_state:
+                        st.session_state.pdf_jobs = {}
+
+                    if st.button("💾 Save as PDF"):
+                        st.session_state.pdf_jobs[invoice_search] = submit_pdf_job(invoice_search)
+
+                    job_id = st.session_state.pdf_jobs.get(invoice_search)
+                    if job_id:
+                        job = get_pdf_job(job_id)
+                        if job is not None and job["status"] in ("queued", "running"):
+                            poll_pdf_job(job_id)
+                        else:
+                            show_pdf_job_result(job, invoice_search)
+                else:
+                    # The HTML layout is cheap enough to build inline on every rerun
+                    invoice_date_str = created_at.strftime("%d-%m-%Y")
+                    invoice_html = render_invoice_html(invoice_search, invoice_date_str, prepare_invoice_df(df))
+                    st.download_button(
+                        label="⬇️ Download Invoice HTML",
+                        data=invoice_html.encode("utf-8"),
+                        file_name=f"{invoice_search}.html",
+                        mime="text/html"
+                    )
+                    with st.expander("👁️ Preview"):
+                        components.html(invoice_html, height=900, scrolling=True)
+
+    # ========== BATCH EXPORT ==========
+    with st.expander("📦 Batch Export Invoices (ZIP)"):
+        export_scope = st.radio("Invoices to export", ["All invoices", "Date range"], horizontal=True)
+        batch_format = st.radio("Format", ["PDF", "HTML (browser print)"], horizontal=True, key="batch_format")
+        batch_from, batch_to = None, None
+        if export_scope == "Date range":
+            col1, col2 = st.columns(2)
+            batch_from = col1.date_input("📅 From Date", value=date.today().replace(day=1), key="batch_from_date")
+            batch_to = col2.date_input("📅 To Date", value=date.today(), key="batch_to_date")
+
+        if st.button("📦 Export ZIP"):
+            if batch_from and batch_to and batch_from > batch_to:
+                st.error("❌ 'From Date' cannot be after 'To Date'")
+            else:
+                batch_numbers = select_invoices(batch_from, batch_to)
+                if not batch_numbers:
+                    st.warning("⚠️ No invoices found for this selection.")
+                else:
+                    progress_bar = st.progress(0.0, text="Rendering invoices...")
 
-                # --- ReportLab and PDF setup ---
-                from io import BytesIO
-                from reportlab.lib.pagesizes import A4
-                from reportlab.lib import colors
-                from reportlab.lib.styles import ParagraphStyle
-                from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-                from reportlab.pdfbase import pdfmetrics
-                from reportlab.pdfbase.ttfonts import TTFont
+                    def update_progress(done, total, invoice_number):
+                        progress_bar.progress(done / total, text=f"Rendered {done}/{total} (last: {invoice_number})")
 
-                # Try to register Times New Roman (if available), otherwise fallback to built-ins
-                try:
-                    pdfmetrics.registerFont(TTFont('TimesNewRoman', 'Times New Roman.ttf'))
-                    pdfmetrics.registerFont(TTFont('TimesNewRoman-Bold', 'Times New Roman Bold.ttf'))
-                    base_font = 'TimesNewRoman'
-                    bold_font = 'TimesNewRoman-Bold'
-                except Exception:
-                    base_font = 'Times-Roman'
-                    bold_font = 'Times-Bold'
-
-                # Header function (Bill No & Date in bold)
-                def header(canvas, doc):
-                    canvas.saveState()
-                    width, height = A4
-                    margin = 50
-
-                    # Outer border
-                    border_thickness_mm = 0.20
-                    border_thickness_pts = border_thickness_mm * 72 / 25.4
-                    canvas.setLineWidth(border_thickness_pts)
-                    canvas.setStrokeColor(colors.black)
-                    canvas.rect(margin, margin, width - 2 * margin, height - 1.5 * margin)
-
-                    y_top = height - margin
-                    canvas.setFont(base_font, 12)
-                    canvas.drawString(margin + 2, y_top, "PAN No: DJOPB0004F")
-                    canvas.drawRightString(width - margin - 2, y_top, "Mob: 8825766745")
-
-                    canvas.setFont(base_font, 14)
-                    canvas.drawCentredString(width / 2.0, y_top - 20, "JOB INVOICE")
-
-                    canvas.setFont(base_font, 12)
-                    canvas.drawCentredString(width / 2.0, y_top - 40, "SHAHANAZ BANU")
-                    canvas.drawCentredString(width / 2.0, y_top - 55,
-                                             "No : 39/16/2, Nayar vardha Pillai Street, Royapettah, Chennai - 600014")
-
-                    # Bill No & Date in bold
-                    bill_date_y = y_top - 75
-                    canvas.setFont(bold_font, 12)
-                    canvas.drawString(margin + 2, bill_date_y, f"Bill No: {invoice_search}")
-                    canvas.drawRightString(width - margin - 2, bill_date_y, f"Date: {invoice_date_str}")
-
-                    # Box around Bill No & Date
-                    canvas.setLineWidth(0.5)
-                    canvas.rect(margin, bill_date_y - 2, width - 2 * margin, 15, stroke=1, fill=0)
-
-                    # Party Info
-                    y_party = y_top - 95
-                    canvas.setFont(base_font, 12)
-                    canvas.drawString(margin + 2, y_party, "Party : SINGHI TEXTORIUM")
-                    canvas.drawString(margin + 37, y_party - 15, "No : 145, G.N. Street,")
-                    canvas.drawString(margin + 37, y_party - 30, "Chennai - 600001.")
-                    canvas.drawCentredString((width / 2.0) + 72, y_party, "GSTIN : 33AAAFS8731L1Z0")
-                    canvas.drawCentredString((width / 2.0) + 50, y_party - 15, "Transport: Own")
-                    canvas.drawCentredString((width / 2.0) + 124, y_party - 30, "Apply Reverse Charges Yes/No")
-                    canvas.restoreState()
-
-                # Generate PDF when button clicked
-                if st.button("💾 Save as PDF"):
-                    pdf_buffer = BytesIO()
-                    doc = SimpleDocTemplate(
-                        pdf_buffer,
-                        pagesize=A4,
-                        leftMargin=54,
-                        rightMargin=54,
-                        topMargin=54 + 140,
-                        bottomMargin=54
+                    zip_buffer = BytesIO()
+                    skipped = export_invoices_zip(
+                        batch_numbers, zip_buffer, progress=update_progress,
+                        fmt="pdf" if batch_format == "PDF" else "html"
                     )
 
-                    normal_style = ParagraphStyle(name='Normal', fontName=base_font, fontSize=12, leading=14)
-
-                    elements = []
-
-                    # Prepare table rows and chunk into pages
-                    all_rows = df[print_cols].values.tolist()
-                    header_row = print_cols
-                    chunk_size = 20
-                    chunks = [all_rows[i:i + chunk_size] for i in range(0, len(all_rows), chunk_size)]
-
-                    # column widths
-                    col_widths = [30, 40, 65, 60, 34, 150, 46, 28, 42]
-                    # ✅ PERFECT-ALIGN FOOTER WITH RIGHT-SIDE PRINT
-                    footer_texts = [
-                        ["1. Handkerchiefs Goods 6213", "For SHAHANAZ BANU"],
-                        ["2. Packing of Handkerchiefs Not for sale", ""],
-                        ["3. Good Against party DC and Date                    ________________________", ""],
-                        ["4. SAC Code: 9988                                              ________________________", ""],
-                        ["5. GST will be paid by Principle                          ________________________", ""],
-                        ["Below 20 Lacs Unregistered Manufacturer         ________________________", ""]
-                    ]
-
-                    grand_total = df["Amount"].sum()
-                    total_dozens = round(df["Dozens"].sum(), 2)
-
-                    for page_index, chunk in enumerate(chunks):
-                        table_data = [header_row] + chunk
-
-                        if page_index == len(chunks) - 1:
-                            total_row = ["GRAND TOTAL", "", "", "", "", "", total_dozens, "", grand_total]
-                            table_data.append(total_row)
-
-                        table = Table(table_data, colWidths=col_widths, repeatRows=1)
-
-                        table_style = TableStyle([
-                            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-                            ('FONTNAME', (0, 0), (-1, -1), base_font),
-                            ('FONTSIZE', (0, 0), (-1, -1), 12),
-                            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ])
-
-                        if page_index == len(chunks) - 1:
-                            last_row_idx = len(table_data) - 1
-                            table_style.add('SPAN', (0, last_row_idx), (5, last_row_idx))
-                            table_style.add('ALIGN', (8, last_row_idx), (8, last_row_idx), 'CENTER')
-                            table_style.add('FONTSIZE', (0, last_row_idx), (8, last_row_idx), 13)
-                            table_style.add('FONTNAME', (0, last_row_idx), (0, last_row_idx), bold_font)
-                            table_style.add('FONTNAME', (8, last_row_idx), (8, last_row_idx), bold_font)
-
-                        table.setStyle(table_style)
-                        elements.append(table)
-                        elements.append(Spacer(1, 8))
-
-                        # FOOTER LOOP (clean alignment)
-                        for line in footer_texts:
-                            footer_table = Table([line], colWidths=[350, 150])
-                            footer_table.setStyle(TableStyle([
-                                ('FONTNAME', (0, 0), (-1, -1), base_font),
-                                ('FONTSIZE', (0, 0), (-1, -1), 12),
-                                ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-                                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                            ]))
-                            elements.append(footer_table)
-                            elements.append(Spacer(1, 5))
-
-                        if page_index < len(chunks) - 1:
-                            elements.append(PageBreak())
-
-                    doc.build(elements, onFirstPage=header, onLaterPages=header)
-
-                    st.success("✅ PDF generated successfully")
+                    st.success(f"✅ Exported {len(batch_numbers) - len(skipped)} invoices")
+                    if skipped:
+                        st.warning(f"⚠️ Skipped (no deliveries): {', '.join(skipped)}")
                     st.download_button(
-                        label="⬇️ Download Invoice PDF",
-                        data=pdf_buffer.getvalue(),
-                        file_name=f"{invoice_search}.pdf",
-                        mime="application/pdf"
+                        label="⬇️ Download Invoices ZIP",
+                        data=zip_buffer.getvalue(),
+                        file_name="invoices.zip",
+                        mime="application/zip"
                     )
 # ================= TAB 8: STATISTICS =================
 # ================= TAB 8: STATISTICS =================
 # =========================
 # ================= TAB 8: STATISTICS =================
-with tab8:
+# Every chart on this page reads from the same pinned read-only snapshot
+COMPARE_MODES = ["No comparison", "Previous period", "Same dates last year"]
+
+def comparison_range(start, end, mode):
+    """The range to compare start..end with: the same number of days just before it, or a year earlier."""
+    if mode == "Previous period":
+        return start - timedelta(days=(end - start).days + 1), start - timedelta(days=1)
+
+    def year_back(d):
+        try:
+            return d.replace(year=d.year - 1)
+        except ValueError:
+            # 29 February has no counterpart a year earlier
+            return d.replace(year=d.year - 1, day=28)
+    return year_back(start), year_back(end)
+
+def period_comparison(start, end, compare_from, compare_to, catalog_version):
+    """Per-item boxes, dozens and amount in both ranges, priced from the catalog."""
+    if USE_DELIVERY_STORE:
+        # Same source as the rest of the tab: one bincount per range over the store's day slice
+        current = delivery_store.get_item_totals(start, end)
+        previous = delivery_store.get_item_totals(compare_from, compare_to)
+        df = pd.DataFrame({"item": sorted(current.keys() | previous.keys())})
+        df["boxes"] = df["item"].map(current).fillna(0.0)
+        df["compare_boxes"] = df["item"].map(previous).fillna(0.0)
+    else:
+        # One grouped query over both ranges, in this tab's pinned snapshot
+        df = get_item_totals_by_period(start, end, compare_from, compare_to)
+    pieces, rates = catalog.pricing(df["item"])
+    for prefix in ("", "compare_"):
+        df[prefix + "dozens"] = df[prefix + "boxes"] * pieces / 12
+        df[prefix + "amount"] = df[prefix + "dozens"] * rates
+    return df
+
+def change_note(current, previous, money=False):
+    """KPI card line: percentage change and the comparison value."""
+    shown = f"₹{previous:,.0f}" if money else f"{previous:,.2f}"
+    if previous == 0:
+        return f"new (was {shown})" if current else "no change"
+    pct = (current - previous) / abs(previous) * 100
+    arrow = "▲" if pct > 0 else "▼" if pct < 0 else "■"
+    return f"{arrow} {abs(pct):.1f}% vs {shown}"
+
+with tab8, read_snapshot():
     st.title("📊 Statistics & Insights")
 
     # ---------- KPI STYLES ----------
@@ -794,31 +1009,62 @@ with tab8:
         start_date = st.date_input("📅 From Date", value=date.today().replace(day=1), key="tab8_from_date")
     with c2:
         end_date = st.date_input("📅 To Date", value=date.today(), key="tab8_to_date")
+    compare_mode = st.radio("Compare with", COMPARE_MODES, horizontal=True, key="tab8_compare")
 
     if start_date > end_date:
         st.error("❌ 'From Date' cannot be after 'To Date'")
     else:
+        def add_pricing(frame):
+            # item is categorical, so each item is looked up once rather than once per row
+            pieces, rates = catalog.pricing(frame["item"])
+            frame["Packing Mode"] = pieces
+            frame["Dozens"] = (frame["boxes"] * frame["Packing Mode"]) / 12
+            frame["Amount"] = frame["Dozens"] * rates
+            return frame
+
         try:
-            df = get_dc_delivery_details_with_date_filter(start_date, end_date)
+            # The in-memory store answers range and item filters without a query; it follows
+            # committed writes rather than this tab's pinned snapshot
+            if USE_DELIVERY_STORE:
+                df = delivery_store.get_deliveries(start_date, end_date)
+            else:
+                df = get_dc_delivery_details_with_date_filter(start_date, end_date)
 
             if df.empty:
                 st.warning("⚠️ No records found for the selected date range.")
             else:
                 # ----------- Calculations -----------
-                df["Packing Mode"] = df["item"].apply(lambda x: packing_mode.get(x, 0))
-                df["Dozens"] = (df["boxes"] * df["Packing Mode"]) / 12
-                df["Amount"] = df.apply(
-                    lambda r: r["Dozens"] * amount_per_dozen.get(r["item"], 0), axis=1
-                )
+                warn_unpriced(df)
+                df = add_pricing(df)
 
                 total_boxes = df["boxes"].sum()
                 total_dozens = df["Dozens"].sum()
                 total_amount = df["Amount"].sum()
-                completed_dcs = len(df["dc_entry_number"].unique())
+                completed_dcs = df["dc_entry_number"].nunique()
 
                 num_days = (end_date - start_date).days + 1
                 avg_daily_amount = total_amount / num_days if num_days > 0 else 0
 
+                # ---------- COMPARISON ----------
+                notes = {}
+                if compare_mode != "No comparison":
+                    compare_from, compare_to = comparison_range(start_date, end_date, compare_mode)
+                    comparison = live_read(period_comparison, start_date, end_date, compare_from, compare_to,
+                                           catalog.catalog().version, tables=("dc_delivery_details",))
+                    compare_days = (compare_to - compare_from).days + 1
+                    notes = {
+                        "boxes": change_note(total_boxes, comparison["compare_boxes"].sum()),
+                        "dozens": change_note(total_dozens, comparison["compare_dozens"].sum()),
+                        "amount": change_note(total_amount, comparison["compare_amount"].sum(), money=True),
+                        "avg": change_note(avg_daily_amount, comparison["compare_amount"].sum() / compare_days,
+                                           money=True),
+                    }
+
+                def note_html(key):
+                    if key not in notes:
+                        return ""
+                    return f'<br><span style="font-size:13px">{notes[key]}</span>'
+
                 # ---------- KPI COLOR LOGIC ----------
                 def kpi_color(value, good, medium):
                     if value >= good:
@@ -842,7 +1088,7 @@ with tab8:
                     st.markdown(f"""
                         <div class="kpi-card" style="background:{boxes_color}">
                             📦 Total Boxes<br>
-                            <span style="font-size:24px">{total_boxes:,.0f}</span>
+                            <span style="font-size:24px">{total_boxes:,.0f}</span>{note_html("boxes")}
                         </div>
                     """, unsafe_allow_html=True)
 
@@ -850,7 +1096,7 @@ with tab8:
                     st.markdown(f"""
                         <div class="kpi-card" style="background:{dozens_color}">
                             🧺 Total Dozens<br>
-                            <span style="font-size:24px">{total_dozens:,.2f}</span>
+                            <span style="font-size:24px">{total_dozens:,.2f}</span>{note_html("dozens")}
                         </div>
                     """, unsafe_allow_html=True)
 
@@ -858,7 +1104,7 @@ with tab8:
                     st.markdown(f"""
                         <div class="kpi-card" style="background:{amount_color}">
                             💰 Total Amount<br>
-                            <span style="font-size:24px">₹{total_amount:,.0f}</span>
+                            <span style="font-size:24px">₹{total_amount:,.0f}</span>{note_html("amount")}
                         </div>
                     """, unsafe_allow_html=True)
 
@@ -874,10 +1120,36 @@ with tab8:
                     st.markdown(f"""
                         <div class="kpi-card" style="background:{avg_color}">
                             📊 Avg Amount/Day<br>
-                            <span style="font-size:24px">₹{avg_daily_amount:,.2f}</span>
+                            <span style="font-size:24px">₹{avg_daily_amount:,.2f}</span>{note_html("avg")}
                         </div>
                     """, unsafe_allow_html=True)
 
+                if notes:
+                    st.caption(f"Compared with {compare_from.strftime('%d-%m-%Y')} to {compare_to.strftime('%d-%m-%Y')}")
+                    with st.expander("🔁 Change by Item"):
+                        changes = comparison.copy()
+                        for measure in ("boxes", "dozens", "amount"):
+                            changes[measure + "_change"] = changes[measure] - changes["compare_" + measure]
+                        changes["amount_pct"] = (changes["amount_change"] / changes["compare_amount"].where(
+                            changes["compare_amount"] != 0) * 100)
+                        changes = changes.reindex(changes["amount_change"].abs().sort_values(ascending=False).index)
+                        changes = changes[["item", "boxes", "compare_boxes", "boxes_change",
+                                           "dozens", "compare_dozens", "dozens_change",
+                                           "amount", "compare_amount", "amount_change", "amount_pct"]]
+                        changes.columns = ["Item", "Boxes", "Boxes Before", "Boxes Δ",
+                                           "Dozens", "Dozens Before", "Dozens Δ",
+                                           "Amount", "Amount Before", "Amount Δ", "Amount Δ %"]
+                        st.dataframe(
+                            changes.style.format({
+                                "Boxes": "{:,.2f}", "Boxes Before": "{:,.2f}", "Boxes Δ": "{:+,.2f}",
+                                "Dozens": "{:,.2f}", "Dozens Before": "{:,.2f}", "Dozens Δ": "{:+,.2f}",
+                                "Amount": "₹{:,.2f}", "Amount Before": "₹{:,.2f}", "Amount Δ": "{:+,.2f}",
+                                "Amount Δ %": "{:+.1f}%",
+                            }, na_rep="new"),
+                            use_container_width=True,
+                            hide_index=True
+                        )
+
                 st.markdown("---")
 
                 # ================= ITEM SEARCH FILTER =================
@@ -891,7 +1163,10 @@ with tab8:
                 )
 
                 if selected_item != "-- Select Item --":
-                    item_filtered_df = df[df["item"] == selected_item].copy()
+                    if USE_DELIVERY_STORE:
+                        item_filtered_df = add_pricing(delivery_store.get_deliveries(start_date, end_date, item=selected_item))
+                    else:
+                        item_filtered_df = df[df["item"] == selected_item]
 
                     if item_filtered_df.empty:
                         st.warning("No records found for selected item.")
@@ -909,7 +1184,7 @@ with tab8:
                             "Packing Mode",
                             "Dozens",
                             "Amount"
-                        ]].copy()
+                        ]]
 
                         display_df.columns = [
                             "Sl.No",
@@ -928,7 +1203,8 @@ with tab8:
                                 "Amount": "₹{:,.2f}"
                             }),
                             use_container_width=True,
-                            hide_index=True
+                            hide_index=True,
+                            column_config={"Date": st.column_config.DateColumn(format="DD-MM-YYYY")}
                         )
 
                         total_boxes_item = item_filtered_df["boxes"].sum()
@@ -970,13 +1246,13 @@ with tab8:
 
                 # ---------- Revenue by Item ----------
                 st.markdown("### 🥧 Revenue by Item")
-                item_chart_data = df.groupby("item")["Amount"].sum().reset_index()
+                item_chart_data = df.groupby("item", observed=True)["Amount"].sum().reset_index()
                 fig_pie = px.pie(item_chart_data, values="Amount", names="item", hole=0.4)
                 st.plotly_chart(fig_pie, use_container_width=True)
 
                 # ---------- Cumulative Summary ----------
                 st.markdown("### 🧮 Cumulative Summary by Item")
-                item_summary = df.groupby("item", as_index=False).agg({
+                item_summary = df.groupby("item", as_index=False, observed=True).agg({
                     "Dozens": "sum",
                     "Amount": "sum"
                 }).sort_values(by="Amount", ascending=False)
@@ -1008,7 +1284,7 @@ with tab8:
                         "Packing Mode",
                         "Dozens",
                         "Amount"
-                    ]].copy()
+                    ]]
 
                     df_display.columns = [
                         "Date",
@@ -1022,13 +1298,61 @@ with tab8:
 
                     st.dataframe(df_display.sort_values(by="Date"),
                                  use_container_width=True,
-                                 hide_index=True)
-
-                    csv = df_display.to_csv(index=False).encode('utf-8')
-                    st.download_button("📥 Download CSV",
-                                       data=csv,
+                                 hide_index=True,
+                                 column_config={"Date": st.column_config.DateColumn(format="DD-MM-YYYY")})
+
+                    # Exports stream straight from the database when clicked instead of
+                    # holding a second copy of the range in memory on every rerun
+                    d1, d2 = st.columns(2)
+                    d1.download_button("📥 Download CSV",
+                                       data=lambda: deliveries_csv_bytes(start_date, end_date),
                                        file_name="report.csv",
                                        mime="text/csv")
+                    d2.download_button("📥 Download Parquet",
+                                       data=lambda: deliveries_parquet_bytes(start_date, end_date),
+                                       file_name="report.parquet",
+                                       mime="application/vnd.apache.parquet")
 
         except Exception as e:
-            st.error(f"⚠️ Error loading statistics: {e}")
\ No newline at end of file
+            st.error(f"⚠️ Error loading statistics: {e}")
+
+    # ================= ITEM HISTORY (ALL TIME) =================
+    # Not limited to the dates above: an indexed item -> DC lookup over live and archived DCs, a page at a time
+    st.markdown("---")
+    st.markdown("### 🗂️ Item History (All Time)")
+    history_item = st.selectbox("Item", catalog.item_names(), index=None,
+                                placeholder="Choose an item to see every DC it was on", key="history_item")
+    if history_item:
+        history_tables = ("dc_entries", "dc_rows", "dc_delivery_details")
+        summary = live_read(get_item_history_summary, history_item, tables=history_tables)
+        if summary["dcs"] == 0:
+            st.info("This item has never been on a DC.")
+        else:
+            h1, h2, h3, h4 = st.columns(4)
+            h1.metric("DCs", summary["dcs"])
+            h2.metric("Planned Boxes", f"{summary['planned_boxes']:,.2f}")
+            h3.metric("Delivered Boxes", f"{summary['delivered_boxes']:,.2f}")
+            h4.metric("Pending Boxes", f"{summary['pending_boxes']:,.2f}")
+
+            pages = math.ceil(summary["dcs"] / ITEM_HISTORY_PAGE)
+            page = 1
+            if pages > 1:
+                page = st.number_input(f"Page (of {pages}, newest DCs first)", min_value=1, max_value=pages,
+                                       value=1, step=1, key=f"history_page_{history_item}")
+            history = live_read(get_item_history, history_item, page - 1, tables=history_tables)
+            history = history.rename(columns={
+                "dc_entry_number": "DC No", "created_at": "DC Date", "dozen": "Dozens",
+                "planned_boxes": "Planned Boxes", "delivered_boxes": "Delivered Boxes",
+                "pending_boxes": "Pending Boxes", "deliveries": "Deliveries",
+                "first_delivery": "First Delivery", "last_delivery": "Last Delivery", "archived": "Archived",
+            })
+            st.dataframe(
+                history.style.format({"Planned Boxes": "{:.2f}", "Delivered Boxes": "{:.2f}", "Pending Boxes": "{:.2f}"}),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "DC Date": st.column_config.DatetimeColumn(format="DD-MM-YYYY"),
+                    "First Delivery": st.column_config.DateColumn(format="DD-MM-YYYY"),
+                    "Last Delivery": st.column_config.DateColumn(format="DD-MM-YYYY"),
+                }
+            )
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+Move closed, fully invoiced DCs out of the live database into yearly archive files.
+
+A DC is archived when every item has been delivered in full, every delivery date falls inside a
+saved invoice, and both the DC and its last delivery are older than the cutoff. Its rows move to
+archive/<db>_<year>.db (the year the DC was created); db.py attaches those files on demand, so
+archived DCs stay searchable and still appear in invoices and statistics. Archived DCs are
+read-only.
+
+    python archive.py --before 2025-04-01
+"""
+import argparse
+import os
+from datetime import datetime
+
+import db
+from config import ARCHIVE_DIR
+
+ARCHIVED_TABLES = ("dc_entries", "dc_rows", "dc_delivery_details")
+
+# Closed: no item is short of its planned boxes. Invoiced: no delivery date is outside every invoice.
+ELIGIBLE_QUERY = """
+    SELECT e.dc_entry_number, e.created_at
+    FROM dc_entries e
+    WHERE e.created_at < :cutoff
+      AND NOT EXISTS (
+          SELECT 1 FROM dc_rows r
+          WHERE r.dc_entry_number = e.dc_entry_number
+            AND r.boxes > (SELECT COALESCE(SUM(d.boxes), 0) FROM dc_delivery_details d
+                           WHERE d.dc_entry_number = r.dc_entry_number AND d.item = r.item)
+      )
+      AND EXISTS (SELECT 1 FROM dc_delivery_details d WHERE d.dc_entry_number = e.dc_entry_number)
+      AND NOT EXISTS (
+          SELECT 1 FROM dc_delivery_details d
+          WHERE d.dc_entry_number = e.dc_entry_number
+            AND (d.date >= :cutoff
+                 OR NOT EXISTS (SELECT 1 FROM invoices i WHERE d.date BETWEEN i.from_date AND i.to_date))
+      )
+"""
+
+
+# ----------------- Archive Files -----------------
+def _create_archive_tables(conn, schema):
+    # Same columns as the live tables, so archive and live rows can be UNIONed
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {schema}.dc_entries (dc_entry_number TEXT UNIQUE, created_at TEXT)")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.dc_rows (
+            dc_entry_number TEXT, item TEXT, dozen INTEGER, boxes INTEGER, UNIQUE(dc_entry_number, item)
+        )
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.dc_delivery_details (
+            delivery_id INTEGER, dc_entry_number TEXT, item TEXT, boxes INTEGER, date TEXT
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_delivery_dc ON dc_delivery_details (dc_entry_number)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_delivery_date ON dc_delivery_details (date)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_rows_item ON dc_rows (item, dc_entry_number)")
+    # Created with the current schema, so db.init_db must not migrate it again
+    conn.execute(f"PRAGMA {schema}.user_version = {db.SCHEMA_VERSION}")
+
+
+# ----------------- Archive Job -----------------
+def eligible_dcs(cutoff):
+    """Return {year: [dc_entry_number, ...]} for the DCs that can be archived before cutoff (a date)."""
+    conn = db._connect()
+    try:
+        rows = conn.execute(ELIGIBLE_QUERY, {"cutoff": cutoff.isoformat()}).fetchall()
+    finally:
+        conn.close()
+    by_year = {}
+    for dc_entry_number, created_at in rows:
+        by_year.setdefault(datetime.fromisoformat(created_at).year, []).append(dc_entry_number)
+    return by_year
+
+
+def archive_closed_dcs(cutoff):
+    """Move every eligible DC into its yearly archive. Returns {year: number of DCs archived}."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    moved = {}
+    for year, dc_numbers in sorted(eligible_dcs(cutoff).items()):
+        conn = db._connect()
+        conn.isolation_level = None  # ATTACH has to run outside a transaction
+        try:
+            schema = db._attach_archives(conn, [year])[0]
+            _create_archive_tables(conn, schema)
+            conn.execute("CREATE TEMP TABLE to_archive (dc_entry_number TEXT PRIMARY KEY)")
+            conn.executemany("INSERT INTO temp.to_archive VALUES (?)", [(n,) for n in dc_numbers])
+            in_batch = "dc_entry_number IN (SELECT dc_entry_number FROM temp.to_archive)"
+
+            # In WAL mode a transaction spanning attached files is atomic per file, not across them,
+            # so the copy commits first and the live rows are only deleted once it is on disk. A copy
+            # left behind by a crash is never read: archived_dcs decides where a DC is looked up.
+            conn.execute("BEGIN IMMEDIATE")
+            for table in ARCHIVED_TABLES:
+                conn.execute(f"DELETE FROM {schema}.{table} WHERE {in_batch}")
+                conn.execute(f"INSERT INTO {schema}.{table} SELECT * FROM main.{table} WHERE {in_batch}")
+            conn.execute("COMMIT")
+
+            conn.execute("BEGIN IMMEDIATE")
+            # A DC edited between the two transactions stays live until the next run
+            for table in ARCHIVED_TABLES:
+                conn.execute(f"""
+                    DELETE FROM temp.to_archive WHERE dc_entry_number IN (
+                        SELECT dc_entry_number FROM (
+                            SELECT * FROM main.{table} WHERE {in_batch}
+                            EXCEPT SELECT * FROM {schema}.{table} WHERE {in_batch}
+                        )
+                        UNION
+                        SELECT dc_entry_number FROM (
+                            SELECT * FROM {schema}.{table} WHERE {in_batch}
+                            EXCEPT SELECT * FROM main.{table} WHERE {in_batch}
+                        )
+                    )
+                """)
+            for table in ARCHIVED_TABLES:
+                conn.execute(f"DELETE FROM main.{table} WHERE {in_batch}")
+            conn.execute("INSERT INTO archived_dcs (dc_entry_number, archive_year) "
+                         "SELECT dc_entry_number, ? FROM temp.to_archive", (year,))
+            conn.execute(f"""
+                INSERT INTO archive_files (archive_year, min_date, max_date)
+                SELECT ?, MIN(date), MAX(date) FROM {schema}.dc_delivery_details WHERE true
+                ON CONFLICT(archive_year) DO UPDATE SET min_date = excluded.min_date, max_date = excluded.max_date
+            """, (year,))
+            conn.executemany("UPDATE change_log SET seq = seq + 1 WHERE table_name = ?",
+                             [(table,) for table in ARCHIVED_TABLES])
+            count = conn.execute("SELECT COUNT(*) FROM temp.to_archive").fetchone()[0]
+            conn.execute("COMMIT")
+            moved[year] = count
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--before", required=True, help="cutoff date, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    db.init_db()
+    moved = archive_closed_dcs(datetime.strptime(args.before, "%Y-%m-%d").date())
+    if not moved:
+        print("No DCs to archive.")
+    for year, count in moved.items():
+        print(f"{year}: archived {count} DCs into {db.archive_path(year)}")
@@ -0,0 +1,319 @@
+"""
+Online backups of the DC database.
+
+Snapshots are taken with the sqlite3 online backup API a few pages at a time, so the app keeps
+saving while a backup runs. Each snapshot is integrity-checked and the newest BACKUP_KEEP are kept.
+The yearly archive files the database lists in archive_files are copied with it, into a
+<snapshot>.archives folder next to the snapshot, and restored with it.
+
+    python backup.py backup              take a snapshot now
+    python backup.py list                list snapshots, newest first
+    python backup.py restore <file>      restore a snapshot over the live database
+    python backup.py bench --rows 500000 time a backup of a generated database under write load
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, date, timedelta
+from urllib.request import pathname2url
+
+from config import DB_FILE, BACKUP_DIR
+from db import archive_path
+
+# Pages copied per backup step (4 KiB pages) and the pause between steps
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_PAUSE = 0.005
+# After this many restarts (the source changed mid-copy) the rest is copied in one step
+BACKUP_MAX_RESTARTS = 5
+BACKUP_KEEP = 14
+BACKUP_INTERVAL_HOURS = 6
+
+_scheduler_thread = None
+_scheduler_lock = threading.Lock()
+# (time, message) of the last scheduled backup when it failed, None once one succeeds
+_last_error = None
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+# ----------------- Backup -----------------
+def _read_only(path):
+    """Open path read-only, so a missing file raises instead of being created empty."""
+    return sqlite3.connect("file:" + pathname2url(os.path.abspath(path)) + "?mode=ro", uri=True)
+
+
+def _copy_database(src_path, dest_path, step_pages=BACKUP_STEP_PAGES, pause=BACKUP_STEP_PAUSE):
+    src = _read_only(src_path)
+    dst = sqlite3.connect(dest_path)
+    state = {"remaining": None, "restarts": 0}
+
+    def step(status, remaining, total):
+        # The backup API starts over when another connection writes to the source mid-copy
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        state["remaining"] = remaining
+        # Give writers the lock between steps
+        time.sleep(pause)
+
+    try:
+        # Hold one read transaction across all steps: in WAL mode the copy then comes from a single
+        # snapshot, writers carry on committing and the backup does not start over
+        src.isolation_level = None
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        try:
+            src.backup(dst, pages=step_pages, progress=step)
+        except _TooManyRestarts:
+            src.backup(dst, pages=-1)
+    finally:
+        src.close()
+        dst.close()
+    return state["restarts"]
+
+
+def verify_backup(path):
+    """Run PRAGMA integrity_check on a snapshot; returns True when it reports ok."""
+    conn = _read_only(path)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+    return result == "ok"
+
+
+def _archives_dir(snapshot_path):
+    """Folder holding the archive files that belong to a snapshot."""
+    return os.path.splitext(snapshot_path)[0] + ".archives"
+
+
+def _archive_years(db_path):
+    conn = _read_only(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT archive_year FROM archive_files ORDER BY archive_year")]
+    except sqlite3.OperationalError:
+        # A database from before archiving existed has no archive_files table
+        return []
+    finally:
+        conn.close()
+
+
+def _backup_archives(db_copy_path, archives_dir):
+    """
+    Copy the archive files a copy of the database lists into archives_dir. The live database is
+    copied first: archive.py fills an archive file before it records the move, so these copies hold
+    every DC the database copy says was archived.
+    """
+    for year in _archive_years(db_copy_path):
+        src_path = archive_path(year)
+        if not os.path.exists(src_path):
+            continue
+        os.makedirs(archives_dir, exist_ok=True)
+        dest_path = os.path.join(archives_dir, os.path.basename(src_path))
+        _copy_database(src_path, dest_path)
+        if not verify_backup(dest_path):
+            raise RuntimeError(f"Backup of {src_path} failed integrity check")
+
+
+def list_backups(backup_dir=BACKUP_DIR):
+    """Return snapshot paths, newest first."""
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = os.path.splitext(os.path.basename(DB_FILE))[0] + "-"
+    names = [n for n in os.listdir(backup_dir) if n.startswith(prefix) and n.endswith(".db")]
+    return [os.path.join(backup_dir, n) for n in sorted(names, reverse=True)]
+
+
+def _prune_backups(backup_dir=BACKUP_DIR, keep=BACKUP_KEEP):
+    """Delete all but the newest keep snapshots, with their archive folders."""
+    for old_path in list_backups(backup_dir)[keep:]:
+        os.remove(old_path)
+        shutil.rmtree(_archives_dir(old_path), ignore_errors=True)
+
+
+def backup_now(backup_dir=BACKUP_DIR, keep=BACKUP_KEEP, prune=True):
+    """
+    Take a verified, timestamped snapshot of DB_FILE and, unless prune is False, prune old ones.
+    Returns the snapshot path.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(DB_FILE))[0]
+    final_path = os.path.join(backup_dir, f"{stem}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.db")
+    tmp_path = final_path + ".partial"
+
+    _copy_database(DB_FILE, tmp_path)
+    if not verify_backup(tmp_path):
+        os.remove(tmp_path)
+        raise RuntimeError(f"Backup failed integrity check: {final_path}")
+    try:
+        _backup_archives(tmp_path, _archives_dir(final_path))
+    except Exception:
+        os.remove(tmp_path)
+        shutil.rmtree(_archives_dir(final_path), ignore_errors=True)
+        raise
+    os.replace(tmp_path, final_path)
+
+    if prune:
+        _prune_backups(backup_dir, keep)
+    return final_path
+
+
+# ----------------- Restore -----------------
+def restore_backup(snapshot_path):
+    """
+    Copy a snapshot over the live database (stop the app first).
+
+    The current database (with its archive files) is saved as a snapshot before it is overwritten,
+    then the snapshot's archive files are restored with it. Old snapshots are pruned only once the
+    restore is done, so the one being restored is never deleted under it. Returns the safety
+    snapshot's path.
+    """
+    if not verify_backup(snapshot_path):
+        raise RuntimeError(f"Snapshot failed integrity check, not restoring: {snapshot_path}")
+    archives_dir = _archives_dir(snapshot_path)
+    archives = [os.path.join(archives_dir, name) for name in sorted(os.listdir(archives_dir))
+                if name.endswith(".db")] if os.path.isdir(archives_dir) else []
+    for path in archives:
+        if not verify_backup(path):
+            raise RuntimeError(f"Archive file failed integrity check, not restoring: {path}")
+    safety_path = backup_now(prune=False) if os.path.exists(DB_FILE) else None
+    _copy_database(snapshot_path, DB_FILE, step_pages=-1)
+    for year in _archive_years(DB_FILE):
+        path = os.path.join(archives_dir, os.path.basename(archive_path(year)))
+        if path in archives:
+            os.makedirs(os.path.dirname(archive_path(year)), exist_ok=True)
+            _copy_database(path, archive_path(year), step_pages=-1)
+    _prune_backups()
+    return safety_path
+
+
+# ----------------- Scheduler -----------------
+def _newest_backup_time():
+    backups = list_backups()
+    return datetime.fromtimestamp(os.path.getmtime(backups[0])) if backups else None
+
+
+def backup_status():
+    """
+    Return (time of the newest snapshot or None, error), where error is (time, message) when the
+    last scheduled backup in this process failed and None otherwise.
+    """
+    return _newest_backup_time(), _last_error
+
+
+def _scheduler_loop(interval_hours):
+    global _last_error
+    interval = timedelta(hours=interval_hours)
+    while True:
+        # Back up straight away when the newest snapshot is already due (or there is none), so a
+        # restart does not push the next backup a full interval out
+        newest = _newest_backup_time()
+        if newest is None or datetime.now() - newest >= interval:
+            try:
+                backup_now()
+                _last_error = None
+            except Exception as e:
+                _last_error = (datetime.now(), str(e))
+                print(f"Scheduled backup failed: {e}")
+            time.sleep(interval.total_seconds())
+        else:
+            time.sleep((newest + interval - datetime.now()).total_seconds())
+
+
+def start_backup_scheduler(interval_hours=BACKUP_INTERVAL_HOURS):
+    """Start the periodic backup thread once per process; safe to call on every Streamlit rerun."""
+    global _scheduler_thread
+    with _scheduler_lock:
+        if _scheduler_thread is None:
+            _scheduler_thread = threading.Thread(
+                target=_scheduler_loop, args=(interval_hours,), name="db-backup", daemon=True
+            )
+            _scheduler_thread.start()
+
+
+# ----------------- Benchmark -----------------
+def _generate_database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE dc_delivery_details (dc_entry_number TEXT, item TEXT, boxes REAL, date TEXT)")
+    start = date(2020, 1, 1)
+    conn.executemany(
+        "INSERT INTO dc_delivery_details VALUES (?, ?, ?, ?)",
+        ((str(n // 8), f"Item {n % 150}", float(n % 400), (start + timedelta(days=n % 2000)).isoformat())
+         for n in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def bench(rows):
+    workdir = tempfile.mkdtemp()
+    src_path = os.path.join(workdir, "bench.db")
+    _generate_database(src_path, rows)
+    size_mb = os.path.getsize(src_path) / 1e6
+
+    stop = threading.Event()
+    stalls = []
+
+    def writer():
+        conn = sqlite3.connect(src_path, timeout=30)
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            conn.execute("INSERT INTO dc_delivery_details VALUES ('bench', 'Item 0', 1.0, '2025-01-01')")
+            conn.commit()
+            stalls.append(time.perf_counter() - t0)
+            time.sleep(0.01)
+        conn.close()
+
+    # Writer latency with no backup running, for comparison
+    t = threading.Thread(target=writer)
+    t.start()
+    time.sleep(1.0)
+    stop.set()
+    t.join()
+    baseline = max(stalls)
+
+    stalls.clear()
+    stop.clear()
+    t = threading.Thread(target=writer)
+    t.start()
+    t0 = time.perf_counter()
+    restarts = _copy_database(src_path, os.path.join(workdir, "copy.db"))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    t.join()
+
+    print(f"database: {rows} rows, {size_mb:.1f} MB")
+    print(f"backup: {elapsed:.2f}s ({restarts} restarts), {len(stalls)} concurrent commits")
+    print(f"writer commit latency max: {max(stalls) * 1000:.1f} ms during backup, "
+          f"{baseline * 1000:.1f} ms idle")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backup")
+    sub.add_parser("list")
+    restore_parser = sub.add_parser("restore")
+    restore_parser.add_argument("snapshot")
+    bench_parser = sub.add_parser("bench")
+    bench_parser.add_argument("--rows", type=int, default=500000)
+    args = parser.parse_args()
+
+    if args.command == "backup":
+        print(backup_now())
+    elif args.command == "list":
+        for path in list_backups():
+            print(path)
+    elif args.command == "restore":
+        safety = restore_backup(args.snapshot)
+        print(f"Restored {args.snapshot} (previous database saved as {safety})")
+    else:
+        bench(args.rows)
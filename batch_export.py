@@ -0,0 +1,65 @@
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from db import get_all_invoices
+from invoice_pdf import build_invoice_pdf
+from invoice_html import build_invoice_html
+
+
+# ----------------- Invoice Selection -----------------
+def select_invoices(from_date=None, to_date=None):
+    """Return invoice numbers whose date range overlaps [from_date, to_date]; all invoices if no range."""
+    invoice_numbers = []
+    for inv in get_all_invoices():
+        if from_date is not None and to_date is not None:
+            inv_from = datetime.fromisoformat(inv['from_date']).date()
+            inv_to = datetime.fromisoformat(inv['to_date']).date()
+            if inv_to < from_date or inv_from > to_date:
+                continue
+        invoice_numbers.append(inv['invoice_number'])
+    return invoice_numbers
+
+
+# ----------------- Worker -----------------
+def _render_invoice(invoice_number, fmt):
+    # Runs in a worker process: each worker opens its own DB connection and shares the PDF cache
+    if fmt == "html":
+        html_doc = build_invoice_html(invoice_number)
+        return invoice_number, html_doc.encode("utf-8") if html_doc is not None else None
+    return invoice_number, build_invoice_pdf(invoice_number)
+
+
+def _zip_name(invoice_number, fmt):
+    return re.sub(r'[\\/:*?"<>|]', "_", str(invoice_number)) + "." + fmt
+
+
+# ----------------- Batch Export -----------------
+def export_invoices_zip(invoice_numbers, out, progress=None, max_workers=None, fmt="pdf"):
+    """
+    Render invoices in parallel across CPU cores and write each one into a ZIP archive as it finishes.
+
+    out is a file path or a writable binary file object and fmt is "pdf" or "html". progress, if
+    given, is called as progress(done, total, invoice_number) after every invoice. Returns the
+    invoice numbers that were skipped because they have no deliveries.
+    """
+    total = len(invoice_numbers)
+    skipped = []
+    if max_workers is None:
+        max_workers = min(total, os.cpu_count() or 1) or 1
+
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_render_invoice, number, fmt) for number in invoice_numbers]
+            for done, future in enumerate(as_completed(futures), start=1):
+                invoice_number, data = future.result()
+                if data is None:
+                    skipped.append(invoice_number)
+                else:
+                    zf.writestr(_zip_name(invoice_number, fmt), data)
+                if progress:
+                    progress(done, total, invoice_number)
+
+    return skipped
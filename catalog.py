@@ -0,0 +1,210 @@
+"""
+Item catalog: every item with its pieces per box and rate per dozen, read from items.csv.
+
+The file is compiled into one validated catalog: names are matched on a normalized key (curly
+and straight apostrophes, spacing and case are treated alike), items can be looked up by name or
+ID, and pieces per box and rates are held as arrays indexed by item ID for vectorized pricing.
+When the file changes on disk the catalog is recompiled on the next lookup; if the edited file
+does not validate, the previous catalog stays in use and load_error() says why.
+
+    python catalog.py        check items.csv and print a summary
+"""
+import argparse
+import csv
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from config import CATALOG_FILE
+
+CATALOG_COLUMNS = ["id", "item", "pieces_per_box", "rate_per_dozen"]
+# How often a lookup may stat the catalog file for changes
+RELOAD_CHECK_SECONDS = 2
+
+Item = namedtuple("Item", "id name key pieces_per_box rate_per_dozen")
+# names: item names in file order; by_id / by_key: Item lookups; pieces / rates: arrays indexed by ID
+# (index 0 is never a valid ID and prices at 0); version: file mtime the catalog was compiled from
+Catalog = namedtuple("Catalog", "items names by_id by_key pieces rates version resolved")
+
+_lock = threading.Lock()
+_catalog = None
+_checked_at = 0.0
+_error = None
+
+
+# ----------------- Compiling -----------------
+def normalize(name):
+    """The key an item name is matched on: curly quotes straightened, spacing collapsed, case folded."""
+    name = unicodedata.normalize("NFKC", str(name))
+    name = name.replace("’", "'").replace("‘", "'").replace("′", "'")
+    return re.sub(r"\s+", " ", name).strip().casefold()
+
+
+def _positive_int(value, column, line):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{CATALOG_FILE} line {line}: {column} must be a whole number, got {value!r}")
+    if number <= 0:
+        raise ValueError(f"{CATALOG_FILE} line {line}: {column} must be greater than 0, got {number}")
+    return number
+
+
+def compile_catalog(rows, version=0):
+    """Validate catalog rows (dicts with CATALOG_COLUMNS, from line 2 of the file) into a Catalog."""
+    items, by_id, by_key = [], {}, {}
+    for line, row in enumerate(rows, start=2):
+        item_id = _positive_int(row.get("id"), "id", line)
+        name = (row.get("item") or "").strip()
+        if not name:
+            raise ValueError(f"{CATALOG_FILE} line {line}: item name is empty")
+        item = Item(item_id, name, normalize(name),
+                    _positive_int(row.get("pieces_per_box"), "pieces_per_box", line),
+                    _positive_int(row.get("rate_per_dozen"), "rate_per_dozen", line))
+        if item_id in by_id:
+            raise ValueError(f"{CATALOG_FILE} line {line}: id {item_id} is already used by '{by_id[item_id].name}'")
+        if item.key in by_key:
+            raise ValueError(f"{CATALOG_FILE} line {line}: '{name}' is the same item as '{by_key[item.key].name}'")
+        items.append(item)
+        by_id[item_id] = by_key[item.key] = item
+    if not items:
+        raise ValueError(f"{CATALOG_FILE} has no items")
+
+    size = max(by_id) + 1
+    pieces = np.zeros(size, np.int16)
+    rates = np.zeros(size, np.int32)
+    for item in items:
+        pieces[item.id] = item.pieces_per_box
+        rates[item.id] = item.rate_per_dozen
+    names = tuple(item.name for item in items)
+    # Exact names resolve without normalizing; other spellings are added on first lookup
+    resolved = {item.name: item for item in items}
+    return Catalog(tuple(items), names, by_id, by_key, pieces, rates, version, resolved)
+
+
+def _read(path):
+    # utf-8-sig: a file saved from Excel starts with a byte order mark
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None or [c.strip() for c in reader.fieldnames] != CATALOG_COLUMNS:
+            raise ValueError(f"{path} must have the columns {', '.join(CATALOG_COLUMNS)}")
+        return list(reader)
+
+
+def _load(path, version):
+    return compile_catalog(_read(path), version)
+
+
+# ----------------- Current Catalog -----------------
+def catalog():
+    """The compiled catalog, recompiled first if items.csv has changed since it was loaded."""
+    global _catalog, _checked_at, _error
+    now = time.monotonic()
+    if _catalog is not None and now - _checked_at < RELOAD_CHECK_SECONDS:
+        return _catalog
+    with _lock:
+        if _catalog is not None and now - _checked_at < RELOAD_CHECK_SECONDS:
+            return _catalog
+        version = os.stat(CATALOG_FILE).st_mtime_ns
+        if _catalog is None:
+            # Nothing to fall back on at startup, so a broken file fails loudly
+            _catalog = _load(CATALOG_FILE, version)
+        elif version != _catalog.version:
+            try:
+                _catalog = _load(CATALOG_FILE, version)
+                _error = None
+            except (OSError, ValueError) as e:
+                _error = str(e)
+        _checked_at = now
+        return _catalog
+
+
+def load_error():
+    """Why the last edit to items.csv was not loaded, or None if the file in use is current."""
+    catalog()
+    return _error
+
+
+# ----------------- Lookups -----------------
+def _resolve(current, name):
+    item = current.resolved.get(name)
+    if item is None and name not in current.resolved:
+        item = current.resolved[name] = current.by_key.get(normalize(name))
+    return item
+
+
+def item_names():
+    """Item names in catalog order, for pickers. The same tuple is returned until the file changes."""
+    return catalog().names
+
+
+def lookup(name):
+    """The Item for a name (any apostrophe, spacing or case), or None if it is not in the catalog."""
+    return _resolve(catalog(), name)
+
+
+def get_item(item_id):
+    """The Item with this catalog ID, or None."""
+    return catalog().by_id.get(item_id)
+
+
+def pieces_per_box(name, default=0):
+    item = lookup(name)
+    return item.pieces_per_box if item is not None else default
+
+
+def rate_per_dozen(name, default=0):
+    item = lookup(name)
+    return item.rate_per_dozen if item is not None else default
+
+
+def unknown_items(names):
+    """The names among names that are not in the catalog (these price at 0)."""
+    current = catalog()
+    return sorted({name for name in names if _resolve(current, name) is None})
+
+
+def pricing(items):
+    """
+    (pieces per box, rate per dozen) arrays for a Series of item names, 0 for unknown items.
+
+    For a categorical Series each category is resolved once and the codes index the result.
+    """
+    current = catalog()
+    if isinstance(items.dtype, pd.CategoricalDtype):
+        # The extra trailing 0 is where missing values (code -1) land
+        category_ids = np.fromiter(((item.id if item is not None else 0)
+                                    for item in (_resolve(current, c) for c in items.cat.categories)),
+                                   np.int64, len(items.cat.categories))
+        ids = np.append(category_ids, 0)[items.cat.codes.to_numpy()]
+    else:
+        ids = np.fromiter(((item.id if item is not None else 0)
+                           for item in (_resolve(current, name) for name in items)), np.int64, len(items))
+    return current.pieces[ids], current.rates[ids]
+
+
+def invoice_lines(boxes, items):
+    """
+    (pack mode, dozens, rate, amount) per invoice line, for Series of boxes and item names, exactly
+    as the bill prints them: dozens rounded to 2 places, amount in whole rupees. The invoice PDF
+    and HTML and the stored invoice totals all price through here, so they cannot disagree.
+    """
+    pieces, rates = pricing(items)
+    # Python's round, as before, so printed totals do not shift on half-way values
+    dozens = (boxes * pieces / 12).map(lambda v: round(v, 2))
+    amount = (dozens * rates).round(0).astype(int)
+    return pieces, dozens, rates, amount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    current = _load(CATALOG_FILE, 0)
+    print(f"{CATALOG_FILE}: {len(current.items)} items, IDs {min(current.by_id)}-{max(current.by_id)}")
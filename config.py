@@ -1,349 +1,17 @@
-packing_mode = {
-    # 1–9: value = 3
-    "G 110": 3,
-    "G 140": 3,
-    "G 160": 3,
-    "G 180": 3,
-    "G 180 (PP)": 3,
-    "G 210": 3,
-    "G 230": 3,
-	"G 240": 3,
-    "G 260": 3,
-    "G 290": 3,
+# Items with their pieces per box and rate per dozen (see catalog.py); edits are picked up while the app runs
+CATALOG_FILE = "items.csv"
 
-    # 10–11: value = 5
-    "G 250 (5 Pc’s)": 5,
-    "G 350 (5 Pc’s)": 5,
-	"G 460 (6 Pc’s)": 6,
-    # 12: value = 6
-    "G 400 (6 Pc’s)": 6,
-
-    # 13–15: value = 3
-    "L 110": 3,
-	"L 130": 3,
-    "L 140": 3,
-	"L 160": 3,
-	"L 180 (PP)": 3,
-    "L 220": 3,
-
-    # 16–17: value = 5
-    "L 175 (5 Pc’s)": 5,
-    "L 240 (5 Pc’s)": 5,
-	"L 340 (6 Pc’s)": 6,
-	"Wedding Collection 260": 3,
-
-    # 18: value = 7
-    "L 340 or Weekly": 7,
-
-    # 19–97: value = 12
-	"New Men (6 Pc's)": 6,
-	"Red Checks (6 Pc's)": 6,
-	"Millenium Geo Plus (6 Pc's)": 6,
-	"Boyz (6 Pc's)": 6,
-	"100% cotton WxW (6 Pc's)": 6,
-    "Polo WxW (12 Pc's box)": 12,
-	"Polo CxC (12 Pc's box)": 12,
-    "Magic WxW (12 Pc's box)": 12,
-    "Jose Wxb (12 Pc's box)": 12,
-    "Madras Checks (12 Pc's box)": 12,
-    "Mulmul WxW (12 Pc's box)": 12,
-    "Cosmo WxW (12 Pc's box)": 12,
-    "Xlent Magic (12 Pc's box)": 12,
-    "Mars Dyed (12 Pc's box)": 12,
-    "Indian (12 Pc's box)": 12,
-    "Anna CxC (12 Pc's box)": 12,
-    "New Men (12 Pc's box)": 12,
-    "Michael CxC (12 Pc's box)": 12,
-    "Governor (12 Pc's box)": 12,
-    "Gold Hem (12 Pc's box)": 12,
-	"Precise (12 Pc's box)": 12,
-	"Marvel WxW (12 Pc's box)": 12,
-	"Imperial (12 Pc's box)": 12,
-	"Prince (12 Pc's box)": 12,
-	"Diamond Plus (12 Pc's box)": 12,
-	"Josh CxC (12 Pc's box)": 12,
-	"Meta (12 Pc's box)": 12,
-	"Tarton (12 Pc's box)": 12,
-	"Urban Checks (12 Pc's box)": 12,
-	"Vintage Hem (12 Pc's box)": 12,
-	"Original (12 Pc's box)": 12,
-    "Silver Satin (12 Pc's box)": 12,
-    "Top Noch (12 Pc's box)": 12,
-    "Gold 19x19 (12 Pc's box)": 12,
-    "Admiral (12 Pc's box)": 12,
-    "President (12 Pc's box)": 12,
-    "Zeal Plain (12 Pc's box)": 12,
-    "Zeal Checks (12 Pc's box)": 12,
-    "Magic LxC (12 Pc's box)": 12,
-    "Magic MxC (12 Pc's box)": 12,
-    "Magic DxC (12 Pc's box)": 12,
-    "100% cotton CxC (12 Pc's box)": 12,
-    "100% cotton LxC (12 Pc's box)": 12,
-    "Mirai (12 Pc's box)": 12,
-    "Pioneer (12 Pc's box)": 12,
-    "Double cloth (12 Pc's box)": 12,
-    "SS tag (Priya)": 12,
-    "SS tag (Roopini)": 12,
-    "SS tag (Suhasini)": 12,
-    "SS tag (Jaini)": 12,
-    "SS tag (Naini)": 12,
-    "SS tag (Roopini Babla)": 12,
-    "SS tag (Super Fine)": 12,
-    "SS tag (Concept)": 12,
-    "SS tag (wonder)": 12,
-    "SS tag (Sensi)": 12,
-    "SS tag (Kasturi)": 12,
-    "SS tag (Best Quality)": 12,
-    "SS tag (Emily)": 12,
-    "SS tag (Shalini Checks)": 12,
-    "SS tag (Shalini Cxc)": 12,
-    "SS tag (Harini)": 12,
-    "SS tag (Queen)": 12,
-    "SS tag (Chota Bhim)": 12,
-    "SS tag (Jaini Babla)": 12,
-    "SS tag (Sofil Baby)": 12,
-    "SS tag (Damini)": 12,
-    "SS tag (Mohini)": 12,
-    "Right Choice LxC": 12,
-    "Right Choice DxC": 12,
-	"Right Choice WxB": 12,
-	#"RIGHT CHOICE WxB (pp)": 12,
-	#"RIGHT CHOICE DxC (pp)": 12,
-	# "RIGHT CHOICE LxC (pp)": 12,
-    "Priemer 12x12 (pp)": 12,
-    "Ultra": 12,
-	#"Ultra (pp)": 12, 
-	"Ultra (6 Pc's)": 6,
-	"YMG Emb (PP)": 6,
-    #"Shalini Emb (pp)": 12,
-	"Shalini Emb (PP)": 12,
-    #"Cosmo Emb (pp)": 12,
-	"Cosmo Emb (PP)": 12,
-    "TCS (Priya)": 12,
-    "TCS (Roopini)": 12,
-    "TCS (Suhasini)": 12,
-    "TCS (Jaini)": 12,
-    "TCS (Naini)": 12,
-    "TCS (Roopini Babla)": 12,
-    "TCS (Super Fine)": 12,
-    "TCS (Concept)": 12,
-    "TCS (wonder)": 12,
-    "TCS (Sensi)": 12,
-    "TCS (Kasturi)": 12,
-    "TCS (Best Quality)": 12,
-    "TCS (Emily)": 12,
-    "TCS (Shalini Checks)": 12,
-    "TCS (Shalini Cxc)": 12,
-    "TCS (Harini)": 12,
-    "TCS (Queen)": 12,
-    "TCS (Chota Bhim)": 12,
-    "TCS (Jaini Babla)": 12,
-    "TCS (Sofil Baby)": 12,
-    "TCS (Damini)": 12,
-    "TCS (Mohini)": 12,
-    "Chota Bhim (6 Pc's)": 6,
-    "Collage (6 Pc's)": 6,
-    "Damini (6 Pc's)": 6,
-    "Emily (6 Pc's)": 6,
-    "Eureka (6 Pc's)": 6,
-    "Jaini (6 Pc's)": 6,
-    "Jaini Babla (6 Pc's)": 6,
-    "Kasturi (6 Pc's)": 6,
-    "Mojo WxW (6 Pc's)": 6,
-    "Naini (6 Pc's)": 6,
-    "Parniti (6 Pc's)": 6,
-    "Pride (6 Pc's)": 6,
-    "Priya (6 Pc's)": 6,
-    "Queen (6 Pc's)": 6,
-    "Roopini (6 Pc's)": 6,
-    "Roopini Babla (6 Pc's)": 6,
-    "Shalini CxC (6 Pc's)": 6,
-    "Shalini Checks (6 Pc's)": 6,
-    "Shalini WxW (6 Pc's)": 6,
-    "Seetha Dyed (6 Pc's)": 6,
-    "Sindoor (6 Pc's)": 6,
-    "Slim (6 Pc's)": 6,
-    "Sofil Baby (6 Pc's)": 6,
-    "Suhasini (6 Pc's)": 6,
-    "Wonder (6 Pc's)": 6,
-    "Zero (6 Pc's)": 6,
-    "Namo WxW (6 Pc's)": 6
-}
-
-amount_per_dozen = {
-    # 1–9: value = 3
-    "G 110": 18,
-    "G 140": 18,
-    "G 160": 18,
-    "G 180": 18,
-    "G 180 (PP)": 18,
-    "G 210": 18,
-    "G 230": 18,
-	"G 240": 18,
-    "G 260": 18,
-    "G 290": 18,
-
-    # 10–11: value = 5
-    "G 250 (5 Pc’s)": 18,
-    "G 350 (5 Pc’s)": 18,
-	"G 460 (6 Pc’s)": 18,
-    # 12: value = 6
-    "G 400 (6 Pc’s)": 18,
-
-    # 13–15: value = 3
-    "L 110": 18,
-	"L 130": 18,
-    "L 140": 18,
-	"L 160": 18,
-	"L 180 (PP)": 18,
-    "L 220": 18,
-
-    # 16–17: value = 5
-    "L 175 (5 Pc’s)": 18,
-    "L 240 (5 Pc’s)": 18,
-	"L 340 (6 Pc’s)": 18,
-	"Wedding Collection 260": 18,
+DB_FILE = "fruit_packing22.db"
 
-    # 18: value = 7
-    "L 340 or Weekly": 18,
+PDF_CACHE_DIR = "pdf_cache"
 
-    # 19–97: value = 12
-	"New Men (6 Pc's)": 4,
-	"Red Checks (6 Pc's)": 4,
-	"Millenium Geo Plus (6 Pc's)": 4,
-	"Boyz (6 Pc's)": 4,
-	"100% cotton WxW (6 Pc's)": 4,
-    "Polo WxW (12 Pc's box)": 4,
-	"Polo CxC (12 Pc's box)": 4,
-    "Magic WxW (12 Pc's box)": 4,
-    "Jose Wxb (12 Pc's box)": 4,
-    "Madras Checks (12 Pc's box)": 4,
-    "Mulmul WxW (12 Pc's box)": 4,
-    "Cosmo WxW (12 Pc's box)": 4,
-    "Xlent Magic (12 Pc's box)": 4,
-    "Mars Dyed (12 Pc's box)": 4,
-    "Indian (12 Pc's box)": 4,
-    "Anna CxC (12 Pc's box)": 4,
-    "New Men (12 Pc's box)": 4,
-    "Michael CxC (12 Pc's box)": 4,
-    "Governor (12 Pc's box)": 4,
-    "Gold Hem (12 Pc's box)": 4,
-	"Precise (12 Pc's box)": 4,
-	"Marvel WxW (12 Pc's box)": 4,
-	"Imperial (12 Pc's box)": 4,
-	"Prince (12 Pc's box)": 4,
-	"Diamond Plus (12 Pc's box)": 4,
-	"Josh CxC (12 Pc's box)": 4,
-	"Meta (12 Pc's box)": 4,
-	"Tarton (12 Pc's box)": 4,
-	"Urban Checks (12 Pc's box)": 4,
-	"Vintage Hem (12 Pc's box)": 4,
-	"Original (12 Pc's box)": 4,
-    "Silver Satin (12 Pc's box)": 4,
-    "Top Noch (12 Pc's box)": 4,
-    "Gold 19x19 (12 Pc's box)": 4,
-    "Admiral (12 Pc's box)": 4,
-    "President (12 Pc's box)": 4,
-    "Zeal Plain (12 Pc's box)": 4,
-    "Zeal Checks (12 Pc's box)": 4,
-    "Magic LxC (12 Pc's box)": 4,
-    "Magic MxC (12 Pc's box)": 4,
-    "Magic DxC (12 Pc's box)": 4,
-    "100% cotton CxC (12 Pc's box)": 4,
-    "100% cotton LxC (12 Pc's box)": 4,
-    "Mirai (12 Pc's box)": 4,
-    "Pioneer (12 Pc's box)": 4,
-    "Double cloth (12 Pc's box)": 4,
-    "SS tag (Priya)": 4,
-    "SS tag (Roopini)": 4,
-    "SS tag (Suhasini)": 4,
-    "SS tag (Jaini)": 4,
-    "SS tag (Naini)": 4,
-    "SS tag (Roopini Babla)": 4,
-    "SS tag (Super Fine)": 4,
-    "SS tag (Concept)": 4,
-    "SS tag (wonder)": 4,
-    "SS tag (Sensi)": 4,
-    "SS tag (Kasturi)": 4,
-    "SS tag (Best Quality)": 4,
-    "SS tag (Emily)": 4,
-    "SS tag (Shalini Checks)": 4,
-    "SS tag (Shalini Cxc)": 4,
-    "SS tag (Harini)": 4,
-    "SS tag (Queen)": 4,
-    "SS tag (Chota Bhim)": 4,
-    "SS tag (Jaini Babla)": 4,
-    "SS tag (Sofil Baby)": 4,
-    "SS tag (Damini)": 4,
-    "SS tag (Mohini)": 4,
-    "Right Choice LxC": 4,
-    "Right Choice DxC": 4,
-	"Right Choice WxB": 4,
-	#"RIGHT CHOICE WxB (pp)": 4,
-	#"RIGHT CHOICE DxC (pp)": 4,
-	#"RIGHT CHOICE LxC (pp)": 4,
-    "Priemer 12x12 (pp)": 6,
-    "Ultra": 6,
-	#"Ultra (pp)": 6,
-	"Ultra (6 Pc's)": 4,
-	"YMG Emb (PP)": 6,
-    #"Shalini Emb (pp)": 6,
-	"Shalini Emb (PP)": 6,
-    #"Cosmo Emb (pp)": 6,
-	"Cosmo Emb (PP)": 6,
-    "TCS (Priya)": 4,
-    "TCS (Roopini)": 4,
-    "TCS (Suhasini)": 4,
-    "TCS (Jaini)": 4,
-    "TCS (Naini)": 4,
-    "TCS (Roopini Babla)": 4,
-    "TCS (Super Fine)": 4,
-    "TCS (Concept)": 4,
-    "TCS (wonder)": 4,
-    "TCS (Sensi)": 4,
-    "TCS (Kasturi)": 4,
-    "TCS (Best Quality)": 4,
-    "TCS (Emily)": 4,
-    "TCS (Shalini Checks)": 4,
-    "TCS (Shalini Cxc)": 4,
-    "TCS (Harini)": 4,
-    "TCS (Queen)": 4,
-    "TCS (Chota Bhim)": 4,
-    "TCS (Jaini Babla)": 4,
-    "TCS (Sofil Baby)": 4,
-    "TCS (Damini)": 4,
-    "TCS (Mohini)": 4,
-    "Chota Bhim (6 Pc's)": 4,
-    "Collage (6 Pc's)": 4,
-    "Damini (6 Pc's)": 4,
-    "Emily (6 Pc's)": 4,
-    "Eureka (6 Pc's)": 4,
-    "Jaini (6 Pc's)": 4,
-    "Jaini Babla (6 Pc's)": 4,
-    "Kasturi (6 Pc's)": 4,
-    "Mojo WxW (6 Pc's)": 4,
-    "Naini (6 Pc's)": 4,
-    "Parniti (6 Pc's)": 4,
-    "Pride (6 Pc's)": 4,
-    "Priya (6 Pc's)": 4,
-    "Queen (6 Pc's)": 4,
-    "Roopini (6 Pc's)": 4,
-    "Roopini Babla (6 Pc's)": 4,
-    "Shalini CxC (6 Pc's)": 4,
-    "Shalini Checks (6 Pc's)": 4,
-    "Shalini WxW (6 Pc's)": 4,
-    "Seetha Dyed (6 Pc's)": 4,
-    "Sindoor (6 Pc's)": 4,
-    "Slim (6 Pc's)": 4,
-    "Sofil Baby (6 Pc's)": 4,
-    "Suhasini (6 Pc's)": 4,
-    "Wonder (6 Pc's)": 4,
-    "Zero (6 Pc's)": 4,
-    "Namo WxW (6 Pc's)": 4
-}
+BACKUP_DIR = "backups"
 
-items = list(packing_mode.keys())
+ARCHIVE_DIR = "archive"
 
-DB_FILE = "fruit_packing22.db"
+# Serve the statistics tab from the in-memory delivery store (delivery_store.py) instead of SQLite.
+# Off by default: the store follows committed writes, while the SQLite path reads the whole tab from
+# one pinned snapshot. The all-time item history always reads SQLite.
+USE_DELIVERY_STORE = False
 
 boxes_pp_heading_name = "Boxes/PP Cover/PP Box"
\ No newline at end of file
@@ -1,13 +1,63 @@
+import os
 import sqlite3
-from datetime import datetime
+import functools
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from urllib.request import pathname2url
 import pandas as pd
-from config import DB_FILE
+import catalog
+from config import DB_FILE, ARCHIVE_DIR
+
+# Most operations the writer thread folds into one transaction (group commit)
+WRITE_BATCH_SIZE = 64
+BUSY_TIMEOUT_MS = 10000
+# How often one background thread per process checks change_log for writes made by other processes
+CHANGE_POLL_SECONDS = 2
+
+# Box quantities are stored as integer hundredths of a box (SCHEMA_VERSION 1 onwards);
+# deliveries have a delivery_id key (SCHEMA_VERSION 2 onwards); rows and deliveries are tied
+# to their DC by cascading foreign keys (SCHEMA_VERSION 3 onwards); invoices store their
+# totals (SCHEMA_VERSION 4 onwards)
+BOX_SCALE = 100
+SCHEMA_VERSION = 4
+
+# How many of the latest DCs the item picker looks at to rank frequently used items
+ITEM_USAGE_DCS = 200
+# DCs per page of an item's all-time history
+ITEM_HISTORY_PAGE = 25
+
+# Tables whose changes are published through change_log / data_generation()
+TRACKED_TABLES = ("dc_entries", "dc_rows", "dc_delivery_details", "invoices", "integrity_issues")
+
+_write_queue = queue.Queue()
+_writer_thread = None
+_writer_lock = threading.Lock()
+_snapshot = threading.local()
+_generations = {table: 0 for table in TRACKED_TABLES}
+_generations_lock = threading.Lock()
+_watcher_thread = None
+# Catalog version the stored invoice totals are known to be priced with, and the refresh in flight
+# (reprice_invoices_if_needed)
+_priced_catalog_version = None
+_repricing = None
 
 # ----------------- Initialize Database -----------------
 def init_db():
     conn = sqlite3.connect(DB_FILE)
     c = conn.cursor()
 
+    # WAL lets readers keep their own snapshot while the writer thread commits
+    c.execute("PRAGMA journal_mode=WAL")
+
+    # A new file gets the current schema and version in one transaction, so it is never migrated
+    fresh = c.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'dc_entries'").fetchone()[0] == 0
+    c.execute("BEGIN IMMEDIATE")
+
     # Create tables
     c.execute('''
         CREATE TABLE IF NOT EXISTS dc_entries (
@@ -17,19 +67,21 @@ def init_db():
     ''')
     c.execute('''
         CREATE TABLE IF NOT EXISTS dc_rows (
-            dc_entry_number TEXT,
+            dc_entry_number TEXT REFERENCES dc_entries (dc_entry_number) ON DELETE CASCADE,
             item TEXT,
             dozen INTEGER,
-            boxes REAL,
+            boxes INTEGER,
             UNIQUE(dc_entry_number, item)
         )
     ''')
     c.execute('''
         CREATE TABLE IF NOT EXISTS dc_delivery_details (
+            delivery_id INTEGER PRIMARY KEY AUTOINCREMENT,
             dc_entry_number TEXT,
             item TEXT,
-            boxes REAL,
-            date TEXT
+            boxes INTEGER,
+            date TEXT,
+            FOREIGN KEY (dc_entry_number, item) REFERENCES dc_rows (dc_entry_number, item) ON DELETE CASCADE
         )
     ''')
     c.execute('''
@@ -37,17 +89,517 @@ def init_db():
             invoice_number TEXT PRIMARY KEY,
             from_date TEXT,
             to_date TEXT,
-            created_at TEXT
+            created_at TEXT,
+            line_count INTEGER,
+            total_boxes INTEGER,
+            total_dozens REAL,
+            total_amount INTEGER
+        )
+    ''')
+    # One change sequence per table, bumped by every committed write to it
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            table_name TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    c.executemany("INSERT OR IGNORE INTO change_log (table_name, seq) VALUES (?, 0)",
+                  [(table,) for table in TRACKED_TABLES])
+
+    # Yearly archive files (see archive.py): which DCs moved where, and the delivery dates each file covers
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS archived_dcs (
+            dc_entry_number TEXT PRIMARY KEY,
+            archive_year INTEGER
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS archive_files (
+            archive_year INTEGER PRIMARY KEY,
+            min_date TEXT,
+            max_date TEXT
+        )
+    ''')
+
+    # Data checks (see integrity.py): one row per scan, and the problems the latest scan found
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS integrity_runs (
+            run_at TEXT PRIMARY KEY,
+            issues INTEGER
         )
     ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS integrity_issues (
+            check_name TEXT,
+            dc_entry_number TEXT,
+            item TEXT,
+            detail TEXT
+        )
+    ''')
+
+    if fresh:
+        c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+    if not fresh:
+        _migrate(conn)
+
+    # Station sync (see sync.py): this station's ID, the last change of every DC / invoice, and
+    # how far each peer station has been synced in each direction
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sync_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    c.execute("INSERT OR IGNORE INTO sync_meta (key, value) VALUES ('station_id', ?)", (uuid.uuid4().hex[:12],))
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sync_changes (
+            kind TEXT,
+            key TEXT,
+            seq INTEGER,
+            origin TEXT,
+            PRIMARY KEY (kind, key)
+        )
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sync_changes_seq ON sync_changes (seq)")
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS sync_peers (
+            peer_id TEXT PRIMARY KEY,
+            peer_seq INTEGER NOT NULL DEFAULT 0,
+            acked_seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # Data from before sync existed counts as one local change per DC / invoice
+    c.execute("INSERT OR IGNORE INTO sync_changes (kind, key, seq) SELECT 'dc', dc_entry_number, 1 FROM dc_entries")
+    c.execute("INSERT OR IGNORE INTO sync_changes (kind, key, seq) SELECT 'invoice', invoice_number, 1 FROM invoices")
+    # Also the child-key index the dc_rows -> dc_delivery_details cascade looks deliveries up by
+    c.execute("CREATE INDEX IF NOT EXISTS idx_delivery_dc_item ON dc_delivery_details (dc_entry_number, item)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_delivery_date ON dc_delivery_details (date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_entries_created ON dc_entries (created_at)")
+    # Item -> DC lookups for an item's all-time history
+    c.execute("CREATE INDEX IF NOT EXISTS idx_rows_item ON dc_rows (item, dc_entry_number)")
     conn.commit()
     conn.close()
 
+    # Archive files carry their own copy of the schema and are migrated alongside
+    for year in archive_years():
+        if not os.path.exists(archive_path(year)):
+            continue
+        archive_conn = sqlite3.connect(archive_path(year))
+        try:
+            _migrate(archive_conn, archive=True)
+            archive_conn.execute("CREATE INDEX IF NOT EXISTS idx_rows_item ON dc_rows (item, dc_entry_number)")
+            archive_conn.commit()
+        finally:
+            archive_conn.close()
 
-# ----------------- DC Entry Operations -----------------
-def create_dc_entry(dc_entry_number, rows):
+
+# ----------------- Migrations -----------------
+def _migrate(conn, archive=False):
+    """Bring a database (live or archive) up to SCHEMA_VERSION, tracked in PRAGMA user_version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < 1:
+        # REAL boxes -> INTEGER hundredths. SQLite cannot change a column type, so both tables
+        # are rebuilt (with their indexes) inside one transaction.
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("""
+            CREATE TABLE dc_rows_new (
+                dc_entry_number TEXT,
+                item TEXT,
+                dozen INTEGER,
+                boxes INTEGER,
+                UNIQUE(dc_entry_number, item)
+            )
+        """)
+        conn.execute("""
+            INSERT INTO dc_rows_new (dc_entry_number, item, dozen, boxes)
+            SELECT dc_entry_number, item, dozen, CAST(ROUND(boxes * 100) AS INTEGER) FROM dc_rows
+        """)
+        conn.execute("""
+            CREATE TABLE dc_delivery_details_new (
+                dc_entry_number TEXT,
+                item TEXT,
+                boxes INTEGER,
+                date TEXT
+            )
+        """)
+        conn.execute("""
+            INSERT INTO dc_delivery_details_new (dc_entry_number, item, boxes, date)
+            SELECT dc_entry_number, item, CAST(ROUND(boxes * 100) AS INTEGER), date FROM dc_delivery_details
+        """)
+        for table in ("dc_rows", "dc_delivery_details"):
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_delivery_dc ON dc_delivery_details (dc_entry_number)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_delivery_date ON dc_delivery_details (date)")
+        conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+    if version < 2:
+        # Deliveries get a stable delivery_id, taken from the existing rowid. AUTOINCREMENT keeps the
+        # IDs of deleted and archived deliveries from being handed out again. Archive files keep the
+        # IDs their rows had in the live database, so there it is a plain column.
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        key = "INTEGER" if archive else "INTEGER PRIMARY KEY AUTOINCREMENT"
+        conn.execute(f"""
+            CREATE TABLE dc_delivery_details_new (
+                delivery_id {key},
+                dc_entry_number TEXT,
+                item TEXT,
+                boxes INTEGER,
+                date TEXT
+            )
+        """)
+        conn.execute("""
+            INSERT INTO dc_delivery_details_new (delivery_id, dc_entry_number, item, boxes, date)
+            SELECT rowid, dc_entry_number, item, boxes, date FROM dc_delivery_details ORDER BY rowid
+        """)
+        conn.execute("DROP TABLE dc_delivery_details")
+        conn.execute("ALTER TABLE dc_delivery_details_new RENAME TO dc_delivery_details")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_delivery_dc ON dc_delivery_details (dc_entry_number)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_delivery_date ON dc_delivery_details (date)")
+        conn.execute("PRAGMA user_version = 2")
+        conn.commit()
+    if version < 3 and archive:
+        # Archived DCs are read-only and move as a whole, so archive files carry no foreign keys
+        conn.execute("PRAGMA user_version = 3")
+        conn.commit()
+    elif version < 3:
+        # dc_entries -> dc_rows -> dc_delivery_details foreign keys with ON DELETE CASCADE. Adding a
+        # constraint means rebuilding the child tables; this connection has foreign keys off, so the
+        # DROPs do not cascade, and existing rows that would break a constraint are kept as they are.
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("""
+            CREATE TABLE dc_rows_new (
+                dc_entry_number TEXT REFERENCES dc_entries (dc_entry_number) ON DELETE CASCADE,
+                item TEXT,
+                dozen INTEGER,
+                boxes INTEGER,
+                UNIQUE(dc_entry_number, item)
+            )
+        """)
+        conn.execute("INSERT INTO dc_rows_new SELECT dc_entry_number, item, dozen, boxes FROM dc_rows")
+        conn.execute("""
+            CREATE TABLE dc_delivery_details_new (
+                delivery_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dc_entry_number TEXT,
+                item TEXT,
+                boxes INTEGER,
+                date TEXT,
+                FOREIGN KEY (dc_entry_number, item) REFERENCES dc_rows (dc_entry_number, item) ON DELETE CASCADE
+            )
+        """)
+        conn.execute("""
+            INSERT INTO dc_delivery_details_new (delivery_id, dc_entry_number, item, boxes, date)
+            SELECT delivery_id, dc_entry_number, item, boxes, date FROM dc_delivery_details
+        """)
+        # The copy only sets the sequence to the highest ID still present
+        last_id = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'dc_delivery_details'").fetchone()
+        for table in ("dc_rows", "dc_delivery_details"):
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        if last_id is not None:
+            conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'dc_delivery_details'", last_id)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_delivery_dc_item ON dc_delivery_details (dc_entry_number, item)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_delivery_date ON dc_delivery_details (date)")
+        conn.execute("PRAGMA user_version = 3")
+        conn.commit()
+    if version < 4 and not archive:
+        # Stored invoice totals: line count, boxes (hundredths), dozens and amount (paise). Existing
+        # invoices are filled in by refresh_invoice_totals on the next app start.
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(invoices)")}
+        for column, kind in (("line_count", "INTEGER"), ("total_boxes", "INTEGER"),
+                             ("total_dozens", "REAL"), ("total_amount", "INTEGER")):
+            if column not in existing:
+                conn.execute(f"ALTER TABLE invoices ADD COLUMN {column} {kind}")
+    if version < 4:
+        conn.execute("PRAGMA user_version = 4")
+        conn.commit()
+
+
+# ----------------- Fixed-Point Quantities -----------------
+def to_hundredths(boxes):
+    """Box count as stored: integer hundredths of a box."""
+    return int(round(boxes * BOX_SCALE))
+
+
+def amount_paise(hundredths, pack_mode, rate):
+    """
+    Amount in paise for a quantity in hundredths of a box, rounded half up, in integer arithmetic.
+
+    Dozens = boxes * pack_mode / 12 and rupees = dozens * rate, so paise = hundredths * pack_mode
+    * rate / 12. Works on ints and on NumPy integer arrays alike.
+    """
+    return (hundredths * pack_mode * rate * 2 + 12) // 24
+
+
+# ----------------- Connections -----------------
+def _connect():
+    conn = sqlite3.connect(DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # Off by default in SQLite, per connection; the cascading deletes depend on it
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+@contextmanager
+def _reader():
+    """Connection for read functions: the pinned snapshot if one is open, else a fresh connection."""
+    conn = getattr(_snapshot, "conn", None)
+    if conn is not None:
+        yield conn
+        return
+    conn = _connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def read_snapshot():
+    """
+    Pin one read-only snapshot for every db read made inside the block on this thread.
+
+    Analytical pages (statistics, invoice preview) wrap a whole rerun in this so every chart sees
+    the same data version. The connection is opened with mode=ro and, in WAL mode, holds its
+    snapshot without ever blocking the writer thread.
+    """
+    if getattr(_snapshot, "conn", None) is not None:
+        # Already inside a snapshot (nested use): keep the outer one
+        yield _snapshot.conn
+        return
+
+    # Read first: a write that lands before the snapshot is then at worst re-read, never missed
+    generations = dict(zip(TRACKED_TABLES, _committed_generation()))
+    uri = "file:" + pathname2url(os.path.abspath(DB_FILE)) + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.isolation_level = None
+    # ATTACH is not allowed inside a transaction, so every archive is attached up front
+    _attach_archives(conn, [row[0] for row in conn.execute("SELECT archive_year FROM archive_files")])
+    conn.execute("BEGIN")
+    # The snapshot is taken at the first read of the transaction, so take it now
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    _snapshot.conn = conn
+    _snapshot.generations = generations
+    try:
+        yield conn
+    finally:
+        _snapshot.conn = None
+        _snapshot.generations = None
+        conn.execute("ROLLBACK")
+        conn.close()
+
+
+# ----------------- Archives -----------------
+def archive_years():
+    """Years that have an archive file, per archive_files in the live database."""
     conn = sqlite3.connect(DB_FILE)
+    try:
+        return [row[0] for row in conn.execute("SELECT archive_year FROM archive_files ORDER BY archive_year")]
+    finally:
+        conn.close()
+
+
+def archive_path(year):
+    stem = os.path.splitext(os.path.basename(DB_FILE))[0]
+    return os.path.join(ARCHIVE_DIR, f"{stem}_{year}.db")
+
+
+def _attach_archives(conn, years):
+    """ATTACH the given yearly archives (once per connection) and return their schema names."""
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    schemas = []
+    for year in years:
+        schema = f"arch_{int(year)}"
+        if schema not in attached:
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (archive_path(year),))
+        schemas.append(schema)
+    return schemas
+
+
+def _range_sources(conn, from_date, to_date):
+    """Schemas holding deliveries in the range: main, plus only the archives whose dates overlap it."""
+    years = [row[0] for row in conn.execute(
+        "SELECT archive_year FROM archive_files WHERE min_date <= ? AND max_date >= ? ORDER BY archive_year",
+        (to_date.isoformat(), from_date.isoformat())
+    )]
+    return ["main"] + _attach_archives(conn, years)
+
+
+def _dc_source(conn, dc_entry_number):
+    """Schema holding a DC: main, or the archive it was moved to."""
+    row = conn.execute("SELECT archive_year FROM archived_dcs WHERE dc_entry_number = ?",
+                       (dc_entry_number,)).fetchone()
+    if row is None:
+        return "main"
+    return _attach_archives(conn, [row[0]])[0]
+
+
+# ----------------- Writer Thread -----------------
+def _writer_loop():
+    conn = _connect()
+    conn.isolation_level = None  # transactions are managed explicitly below
     c = conn.cursor()
+    while True:
+        # Take everything that is already waiting (up to the batch size) and commit it together
+        batch = [_write_queue.get()]
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        outcomes = []
+        changed = set()
+        try:
+            # Attached up front (ATTACH cannot run inside a transaction) so invoice totals can
+            # include archived deliveries
+            _attach_archives(conn, [row[0] for row in c.execute("SELECT archive_year FROM archive_files")])
+            c.execute("BEGIN IMMEDIATE")
+            for fn, args, kwargs, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                # Each operation gets a savepoint so one failure does not undo the rest of the batch
+                c.execute("SAVEPOINT write_op")
+                try:
+                    result = fn(c, *args, **kwargs)
+                    c.execute("RELEASE write_op")
+                    outcomes.append((future, result, None))
+                    changed.update(fn.tables)
+                except Exception as e:
+                    c.execute("ROLLBACK TO write_op")
+                    c.execute("RELEASE write_op")
+                    outcomes.append((future, None, e))
+            if changed:
+                c.executemany("UPDATE change_log SET seq = seq + 1 WHERE table_name = ?",
+                              [(table,) for table in changed])
+            c.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                c.execute("ROLLBACK")
+            for fn, args, kwargs, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+
+        if changed:
+            _publish_changes(c.execute("SELECT table_name, seq FROM change_log").fetchall())
+
+        # Futures resolve only after the commit, so a caller never sees an uncommitted write
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def _start_writer():
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_writer_loop, name="db-writer", daemon=True)
+            _writer_thread.start()
+
+
+def _write_op(*tables):
+    """
+    Route a write through the single writer thread.
+
+    tables lists the tables the operation modifies; their change sequence is bumped when it
+    commits. The wrapped function receives the writer's cursor as its first argument; callers pass
+    the remaining arguments and get a Future back (call .result() to wait and re-raise errors).
+    """
+    def decorator(fn):
+        fn.tables = tables
+
+        @functools.wraps(fn)
+        def submit(*args, **kwargs):
+            _start_writer()
+            future = Future()
+            _write_queue.put((fn, args, kwargs, future))
+            return future
+        return submit
+    return decorator
+
+
+# ----------------- Change Notifications -----------------
+def _publish_changes(rows):
+    with _generations_lock:
+        for table, seq in rows:
+            if table in _generations and seq > _generations[table]:
+                _generations[table] = seq
+
+
+def _watch_changes():
+    # Picks up commits from other processes sharing the file; our own writer publishes directly
+    while True:
+        try:
+            with _reader() as conn:
+                _publish_changes(conn.execute("SELECT table_name, seq FROM change_log").fetchall())
+        except sqlite3.Error:
+            pass
+        time.sleep(CHANGE_POLL_SECONDS)
+
+
+def data_generation(*tables):
+    """
+    Return the current change sequence of the given tables (all tracked tables if none given).
+
+    Served from memory, so sessions can compare it on every refresh tick without touching the
+    database; any committed write to one of the tables changes the result. Inside read_snapshot
+    it is the sequence from just before the snapshot was taken, so a result read from the
+    snapshot is never cached under a newer write's sequence.
+    """
+    pinned = getattr(_snapshot, "generations", None)
+    if pinned is not None:
+        return tuple(pinned[table] for table in (tables or TRACKED_TABLES))
+    return _committed_generation(*tables)
+
+
+def _committed_generation(*tables):
+    """data_generation ignoring any pinned snapshot, for caches that follow committed writes."""
+    global _watcher_thread
+    with _writer_lock:
+        if _watcher_thread is None:
+            _watcher_thread = threading.Thread(target=_watch_changes, name="db-change-watcher", daemon=True)
+            _watcher_thread.start()
+    with _generations_lock:
+        return tuple(_generations[table] for table in (tables or TRACKED_TABLES))
+
+
+# ----------------- Frame Types -----------------
+def _compact(df, categories=(), dates=()):
+    """
+    Store repeated text (items, DC numbers) as categoricals and ISO date strings as datetimes,
+    which cuts a year of deliveries to a fraction of its object-dtype size.
+    """
+    for col in categories:
+        df[col] = df[col].astype("category")
+    for col in dates:
+        df[col] = pd.to_datetime(df[col], format="ISO8601")
+    return df
+
+
+# ----------------- Sync Change Log -----------------
+def _log_change(c, kind, key, origin=None):
+    """Record that a DC ("dc") or invoice ("invoice") changed; origin is the peer it came from, None if local."""
+    c.execute("""
+        INSERT INTO sync_changes (kind, key, seq, origin)
+        VALUES (?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM sync_changes), ?)
+        ON CONFLICT(kind, key) DO UPDATE SET seq = excluded.seq, origin = excluded.origin
+    """, (kind, key, origin))
+
+
+# ----------------- DC Entry Operations -----------------
+@_write_op("dc_entries", "dc_rows")
+def create_dc_entry(c, dc_entry_number, rows):
+    c.execute("SELECT archive_year FROM archived_dcs WHERE dc_entry_number = ?", (dc_entry_number,))
+    archived = c.fetchone()
+    if archived is not None:
+        raise ValueError(f"DC {dc_entry_number} already exists in the {archived[0]} archive.")
 
     c.execute("INSERT INTO dc_entries (dc_entry_number, created_at) VALUES (?, ?)",
               (dc_entry_number, datetime.now().isoformat()))
@@ -55,84 +607,119 @@ def create_dc_entry(dc_entry_number, rows):
     for row in rows:
         c.execute(
             "INSERT INTO dc_rows (dc_entry_number, item, dozen, boxes) VALUES (?, ?, ?, ?)",
-            (dc_entry_number, row['Item'], row['Dozen'], row['Boxes'])
+            (dc_entry_number, row['Item'], row['Dozen'], to_hundredths(row['Boxes']))
         )
+    _log_change(c, "dc", dc_entry_number)
 
-    conn.commit()
-    conn.close()
+
+def dc_archive_year(dc_entry_number):
+    """The year of the archive file a DC was moved to, or None if it is live (archived DCs are read-only)."""
+    with _reader() as conn:
+        row = conn.execute("SELECT archive_year FROM archived_dcs WHERE dc_entry_number = ?",
+                           (dc_entry_number,)).fetchone()
+    return row[0] if row else None
 
 
 def fetch_dc_entry(dc_entry_number):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-	 # Fetch created_at from dc_entries
-    c.execute('SELECT created_at FROM dc_entries WHERE dc_entry_number = ?', (dc_entry_number,))
-    created_at_row = c.fetchone()
-    created_at = created_at_row[0] if created_at_row else None
-    
-    # Fetch rows from dc_rows
-    c.execute('''
-        SELECT r.item, r.dozen, r.boxes 
-        FROM dc_rows r
-        WHERE r.dc_entry_number = ?
-    ''', (dc_entry_number,))
-    rows = c.fetchall()
-    conn.close()
+    with _reader() as conn:
+        source = _dc_source(conn, dc_entry_number)
+        c = conn.cursor()
+        # Fetch created_at from dc_entries
+        c.execute(f'SELECT created_at FROM {source}.dc_entries WHERE dc_entry_number = ?', (dc_entry_number,))
+        created_at_row = c.fetchone()
+        created_at = created_at_row[0] if created_at_row else None
+
+        # Fetch rows from dc_rows
+        c.execute(f'''
+            SELECT r.item, r.dozen, r.boxes / 100.0
+            FROM {source}.dc_rows r
+            WHERE r.dc_entry_number = ?
+        ''', (dc_entry_number,))
+        rows = c.fetchall()
     dc_data = [{"Item": item, "Dozen": dozen, "Boxes": boxes} for item, dozen, boxes in rows]
     return dc_data, created_at
 
-def delete_dc_entry(dc_entry_number):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-	
-    c.execute("""DELETE FROM dc_entries where dc_entry_number = ?""",
-              (dc_entry_number,))
 
-    c.execute("""
-        DELETE FROM dc_rows 
-        WHERE dc_entry_number = ?
-    """, (dc_entry_number,))
+def get_item_usage(recent_dcs=ITEM_USAGE_DCS):
+    """Return {item: (number of DCs it was on, latest created_at)} over the most recent DCs."""
+    with _reader() as conn:
+        rows = conn.execute("""
+            SELECT r.item, COUNT(*), MAX(e.created_at)
+            FROM (SELECT dc_entry_number, created_at FROM dc_entries ORDER BY created_at DESC LIMIT ?) e
+            JOIN dc_rows r ON r.dc_entry_number = e.dc_entry_number
+            GROUP BY r.item
+        """, (recent_dcs,)).fetchall()
+    return {item: (uses, last_used) for item, uses, last_used in rows}
 
-    c.execute("""
-        DELETE FROM dc_delivery_details
-        WHERE dc_entry_number = ?
-    """, (dc_entry_number,))
+def _check_not_archived(c, dc_entry_number):
+    # Archived DCs live in the yearly archive files and are read-only; writes here only reach main
+    row = c.execute("SELECT archive_year FROM archived_dcs WHERE dc_entry_number = ?", (dc_entry_number,)).fetchone()
+    if row is not None:
+        raise ValueError(f"DC {dc_entry_number} is archived ({row[0]}) and cannot be changed.")
 
-    conn.commit()
-    conn.close()
 
-def update_dc_row(dc_entry_number, item, new_dozen, new_boxes):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("""
-        UPDATE dc_rows 
-        SET dozen = ?, boxes = ?
-        WHERE dc_entry_number = ? AND item = ?
-    """, (new_dozen, new_boxes, dc_entry_number, item))
-    conn.commit()
-    conn.close()
+@_write_op("dc_entries", "dc_rows", "dc_delivery_details", "invoices")
+def delete_dc_entry(c, dc_entry_number):
+    _check_not_archived(c, dc_entry_number)
+    dates = _delivery_dates(c, "dc_entry_number = ?", (dc_entry_number,))
+    # Its rows and deliveries go with it (ON DELETE CASCADE)
+    c.execute("DELETE FROM dc_entries WHERE dc_entry_number = ?", (dc_entry_number,))
+    _log_change(c, "dc", dc_entry_number)
+    _refresh_invoice_totals(c, _invoices_covering(c, dates))
 
-def delete_dc_row(dc_entry_number, item):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("""
-        DELETE FROM dc_rows 
-        WHERE dc_entry_number = ? AND item = ?
-    """, (dc_entry_number, item))
 
+@_write_op("dc_entries", "dc_rows", "dc_delivery_details", "invoices")
+def delete_dc_entries(c, dc_entry_numbers=(), created_from=None, created_to=None):
+    """
+    Delete many DCs (with their rows and deliveries) in one transaction: the DCs listed and/or
+    those created between created_from and created_to (dates, inclusive).
+
+    Returns {table: rows deleted}. Archived DCs are not touched.
+    """
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS doomed_dcs (dc_entry_number TEXT PRIMARY KEY)")
+    c.execute("DELETE FROM temp.doomed_dcs")
+    c.executemany("INSERT OR IGNORE INTO temp.doomed_dcs SELECT dc_entry_number FROM dc_entries WHERE dc_entry_number = ?",
+                  [(n,) for n in dc_entry_numbers])
+    if created_from is not None or created_to is not None:
+        # created_at is an ISO timestamp, so the day after created_to is an exclusive upper bound
+        c.execute("""
+            INSERT OR IGNORE INTO temp.doomed_dcs
+            SELECT dc_entry_number FROM dc_entries WHERE created_at >= ? AND created_at < ?
+        """, ((created_from or date.min).isoformat(),
+              (created_to + timedelta(days=1)).isoformat() if created_to else "9999"))
+
+    in_batch = "dc_entry_number IN (SELECT dc_entry_number FROM temp.doomed_dcs)"
+    counts = {table: c.execute(f"SELECT COUNT(*) FROM {table} WHERE {in_batch}").fetchone()[0]
+              for table in ("dc_entries", "dc_rows", "dc_delivery_details")}
+    for (dc_entry_number,) in c.execute("SELECT dc_entry_number FROM temp.doomed_dcs").fetchall():
+        _log_change(c, "dc", dc_entry_number)
+    dates = _delivery_dates(c, in_batch)
+    c.execute(f"DELETE FROM dc_entries WHERE {in_batch}")
+    _refresh_invoice_totals(c, _invoices_covering(c, dates))
+    return counts
+
+@_write_op("dc_rows")
+def update_dc_row(c, dc_entry_number, item, new_dozen, new_boxes):
+    _check_not_archived(c, dc_entry_number)
     c.execute("""
-        DELETE FROM dc_delivery_details 
+        UPDATE dc_rows 
+        SET dozen = ?, boxes = ?
         WHERE dc_entry_number = ? AND item = ?
-    """, (dc_entry_number, item))
+    """, (new_dozen, to_hundredths(new_boxes), dc_entry_number, item))
+    _log_change(c, "dc", dc_entry_number)
 
-    conn.commit()
-    conn.close()
+@_write_op("dc_rows", "dc_delivery_details", "invoices")
+def delete_dc_row(c, dc_entry_number, item):
+    _check_not_archived(c, dc_entry_number)
+    dates = _delivery_dates(c, "dc_entry_number = ? AND item = ?", (dc_entry_number, item))
+    # The item's deliveries go with it (ON DELETE CASCADE)
+    c.execute("DELETE FROM dc_rows WHERE dc_entry_number = ? AND item = ?", (dc_entry_number, item))
+    _log_change(c, "dc", dc_entry_number)
+    _refresh_invoice_totals(c, _invoices_covering(c, dates))
 
 # ----------------- Delivery Operations -----------------
-def add_dc_delivery_details(dc_entry_number, date, item, boxes):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-
+@_write_op("dc_delivery_details", "invoices")
+def add_dc_delivery_details(c, dc_entry_number, date, item, boxes):
     # Fetch allowed box count
     c.execute("""
         SELECT boxes FROM dc_rows
@@ -140,7 +727,6 @@ def add_dc_delivery_details(dc_entry_number, date, item, boxes):
     """, (dc_entry_number, item))
     row = c.fetchone()
     if row is None:
-        conn.close()
         raise ValueError(f"No record found in dc_rows for DC {dc_entry_number} and item '{item}'.")
 
     allowed_boxes = row[0]
@@ -152,131 +738,317 @@ def add_dc_delivery_details(dc_entry_number, date, item, boxes):
     """, (dc_entry_number, item))
     current_delivered = c.fetchone()[0]
 
-    # Check if new delivery exceeds allowed
-    if current_delivered + boxes > allowed_boxes:
-        conn.close()
+    # Check if new delivery exceeds allowed (exact: all three are integer hundredths)
+    new_boxes = to_hundredths(boxes)
+    if current_delivered + new_boxes > allowed_boxes:
         raise ValueError(
             f"Cannot deliver {boxes} boxes for item '{item}'. "
-            f"Total would be {current_delivered + boxes}, exceeding the allowed {allowed_boxes}."
+            f"Total would be {(current_delivered + new_boxes) / BOX_SCALE}, "
+            f"exceeding the allowed {allowed_boxes / BOX_SCALE}."
         )
 
     c.execute(
         "INSERT INTO dc_delivery_details (dc_entry_number, item, boxes, date) VALUES (?, ?, ?, ?)",
-        (dc_entry_number, item, boxes, date.isoformat())
+        (dc_entry_number, item, new_boxes, date.isoformat())
     )
-    conn.commit()
-    conn.close()
+    delivery_id = c.lastrowid
+    _log_change(c, "dc", dc_entry_number)
+    _refresh_invoice_totals(c, _invoices_covering(c, [date.isoformat()]))
+    return delivery_id
 
 
 def get_dc_delivery_details(dc_entry_number):
-    conn = sqlite3.connect(DB_FILE)
-    query = """
-        SELECT date, item as Item_Name, boxes as Delivered_Boxes 
-        FROM dc_delivery_details
-        WHERE dc_entry_number = ?
-        ORDER BY item
-    """
-    df = pd.read_sql_query(query, conn, params=(dc_entry_number,))
-    df["Delivered_Boxes"] = pd.to_numeric(df["Delivered_Boxes"], errors='coerce').round(2)
-    conn.close()
+    with _reader() as conn:
+        query = f"""
+            SELECT date, item as Item_Name, boxes / 100.0 as Delivered_Boxes, delivery_id
+            FROM {_dc_source(conn, dc_entry_number)}.dc_delivery_details
+            WHERE dc_entry_number = ?
+            ORDER BY item, date, delivery_id
+        """
+        df = pd.read_sql_query(query, conn, params=(dc_entry_number,))
     return df
 
 
 def get_dc_cumulative_delivery_details(dc_entry_number):
-    conn = sqlite3.connect(DB_FILE)
-    query = """
-        SELECT item as Item, SUM(boxes) as total_delivered
-        FROM dc_delivery_details
-        WHERE dc_entry_number = ?
-        GROUP BY item
-        ORDER BY item
-    """
-    df = pd.read_sql_query(query, conn, params=(dc_entry_number,))
-    conn.close()
+    with _reader() as conn:
+        query = f"""
+            SELECT item as Item, SUM(boxes) / 100.0 as total_delivered
+            FROM {_dc_source(conn, dc_entry_number)}.dc_delivery_details
+            WHERE dc_entry_number = ?
+            GROUP BY item
+            ORDER BY item
+        """
+        df = pd.read_sql_query(query, conn, params=(dc_entry_number,))
     return df
 
 
-def get_dc_delivery_details_with_date_filter(from_date, to_date):
-    conn = sqlite3.connect(DB_FILE)
-    query = '''
+def _deliveries_in_range(conn, from_date, to_date, order="DESC"):
+    """Query and params for dc_entry_number, date, item, boxes (hundredths) of every delivery in the range."""
+    # Archives are only attached and scanned when the range reaches into them
+    sources = _range_sources(conn, from_date, to_date)
+    # Archive rows count only for DCs archived_dcs points at (a crashed archive run can leave copies)
+    query = " UNION ALL ".join(f'''
         SELECT dc_entry_number, date, item, boxes
-        FROM dc_delivery_details
+        FROM {source}.dc_delivery_details
         WHERE date BETWEEN ? AND ?
-        ORDER BY date DESC
-    '''
-    df = pd.read_sql_query(query, conn, params=(from_date.isoformat(), to_date.isoformat()))
-    df["boxes"] = pd.to_numeric(df["boxes"], errors='coerce').round(2)
-    df["date"] = pd.to_datetime(df["date"]).dt.strftime('%d-%m-%Y')
-    conn.close()
+    ''' + ("" if source == "main" else
+           f"AND dc_entry_number IN (SELECT dc_entry_number FROM main.archived_dcs "
+           f"WHERE archive_year = {source[len('arch_'):]})")
+        for source in sources) + (f" ORDER BY date {order}" if order else "")
+    params = (from_date.isoformat(), to_date.isoformat()) * len(sources)
+    return query, params
+
+
+def get_dc_delivery_details_with_date_filter(from_date, to_date):
+    with _reader() as conn:
+        query, params = _deliveries_in_range(conn, from_date, to_date)
+        df = pd.read_sql_query(query, conn, params=params)
+    df["boxes"] = df["boxes"] / BOX_SCALE
+    return _compact(df, categories=("dc_entry_number", "item"), dates=("date",))
+
+
+def get_item_totals_by_period(from_date, to_date, compare_from, compare_to):
+    """
+    Boxes and delivery counts per item in the range and in the comparison range, from one grouped
+    query that scans only the two ranges. Columns: item, boxes, deliveries, compare_boxes, compare_deliveries.
+    """
+    with _reader() as conn:
+        current, current_params = _deliveries_in_range(conn, from_date, to_date, order=None)
+        compare, compare_params = _deliveries_in_range(conn, compare_from, compare_to, order=None)
+        # Tagged by period rather than classified by date, so ranges that overlap count in both
+        df = pd.read_sql_query(f"""
+            SELECT item,
+                   SUM(CASE WHEN period = 0 THEN boxes ELSE 0 END) AS boxes,
+                   SUM(period = 0) AS deliveries,
+                   SUM(CASE WHEN period = 1 THEN boxes ELSE 0 END) AS compare_boxes,
+                   SUM(period = 1) AS compare_deliveries
+            FROM (SELECT 0 AS period, item, boxes FROM ({current})
+                  UNION ALL
+                  SELECT 1 AS period, item, boxes FROM ({compare}))
+            GROUP BY item
+            ORDER BY item
+        """, conn, params=current_params + compare_params)
+    df["boxes"] = df["boxes"] / BOX_SCALE
+    df["compare_boxes"] = df["compare_boxes"] / BOX_SCALE
     return df
 
 
-def update_dc_delivery_entry(dc_entry_number, old_date, item, new_boxes, new_date=None):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
+def iter_dc_deliveries(from_date, to_date, chunk_rows=5000):
+    """
+    Yield the deliveries in the range, oldest first, as lists of (dc_entry_number, date, item, boxes)
+    tuples (boxes in integer hundredths) of at most chunk_rows, so a multi-year range never has to
+    fit in memory at once.
+    """
+    with _reader() as conn:
+        query, params = _deliveries_in_range(conn, from_date, to_date, order="ASC")
+        c = conn.cursor()
+        c.execute(query, params)
+        while True:
+            rows = c.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+
+
+# ----------------- Item History -----------------
+def _item_history_rows(conn):
+    """One UNION ALL over dc_rows (with planned, delivered and delivery dates) of main and every archive."""
+    sources = ["main"] + _attach_archives(conn, [row[0] for row in conn.execute("SELECT archive_year FROM archive_files")])
+    # Per source: idx_rows_item finds the item's rows, and each row's deliveries come from the
+    # (dc_entry_number, item) index; archive rows count only for DCs archived_dcs points at
+    return " UNION ALL ".join(f'''
+        SELECT r.dc_entry_number, e.created_at, r.dozen, r.boxes AS planned,
+               COALESCE(SUM(d.boxes), 0) AS delivered, COUNT(d.boxes) AS deliveries,
+               MIN(d.date) AS first_delivery, MAX(d.date) AS last_delivery,
+               {int(source != "main")} AS archived
+        FROM {source}.dc_rows r
+        LEFT JOIN {source}.dc_entries e ON e.dc_entry_number = r.dc_entry_number
+        LEFT JOIN {source}.dc_delivery_details d ON d.dc_entry_number = r.dc_entry_number AND d.item = r.item
+        WHERE r.item = :item
+    ''' + ("" if source == "main" else
+           f"AND r.dc_entry_number IN (SELECT dc_entry_number FROM main.archived_dcs "
+           f"WHERE archive_year = {source[len('arch_'):]}) ") + "GROUP BY r.dc_entry_number"
+        for source in sources)
+
+
+def get_item_history_summary(item):
+    """All-time totals for an item: DCs it was on, planned / delivered / pending boxes, first and last DC."""
+    with _reader() as conn:
+        row = conn.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(planned), 0), COALESCE(SUM(delivered), 0),
+                   COALESCE(SUM(MAX(planned - delivered, 0)), 0), MIN(created_at), MAX(created_at)
+            FROM ({_item_history_rows(conn)})
+        """, {"item": item}).fetchone()
+    dcs, planned, delivered, pending, first_dc, last_dc = row
+    return {
+        "dcs": dcs,
+        "planned_boxes": planned / BOX_SCALE,
+        "delivered_boxes": delivered / BOX_SCALE,
+        "pending_boxes": pending / BOX_SCALE,
+        "first_dc": first_dc,
+        "last_dc": last_dc,
+    }
+
+
+def get_item_history(item, page=0, page_size=ITEM_HISTORY_PAGE):
+    """
+    One page of every DC (live or archived) that has ever had the item, newest DC first, with
+    planned, delivered and pending boxes and the first / last delivery date. Independent of any
+    date range.
+    """
+    with _reader() as conn:
+        df = pd.read_sql_query(f"""
+            SELECT dc_entry_number, created_at, dozen, planned / 100.0 AS planned_boxes,
+                   delivered / 100.0 AS delivered_boxes, MAX(planned - delivered, 0) / 100.0 AS pending_boxes,
+                   deliveries, first_delivery, last_delivery, archived
+            FROM ({_item_history_rows(conn)})
+            ORDER BY created_at DESC, dc_entry_number DESC
+            LIMIT :limit OFFSET :offset
+        """, conn, params={"item": item, "limit": page_size, "offset": page * page_size})
+    df["archived"] = df["archived"].astype(bool)
+    return _compact(df, dates=("created_at", "first_delivery", "last_delivery"))
+
+
+def _check_delivery(c, dc_entry_number, delivery_id):
+    """Return the delivery's date (ISO string)."""
+    # Primary-key lookup; the DC number guards against an ID shown for an archived (read-only) DC
+    row = c.execute("SELECT date FROM dc_delivery_details WHERE delivery_id = ? AND dc_entry_number = ?",
+                    (delivery_id, dc_entry_number)).fetchone()
+    if row is None:
+        raise ValueError(f"Delivery record {delivery_id} of DC {dc_entry_number} no longer exists or is archived.")
+    return row[0]
+
+
+@_write_op("dc_delivery_details", "invoices")
+def update_dc_delivery_entry(c, dc_entry_number, delivery_id, new_boxes, new_date=None):
+    old_date = _check_delivery(c, dc_entry_number, delivery_id)
     if new_date:
-        c.execute("""
-            UPDATE dc_delivery_details 
-            SET boxes = ?, date = ?
-            WHERE dc_entry_number = ? AND item = ? AND date = ?
-        """, (new_boxes, new_date.isoformat(), dc_entry_number, item, old_date.isoformat()))
+        c.execute("UPDATE dc_delivery_details SET boxes = ?, date = ? WHERE delivery_id = ?",
+                  (to_hundredths(new_boxes), new_date.isoformat(), delivery_id))
     else:
-        c.execute("""
-            UPDATE dc_delivery_details 
-            SET boxes = ?
-            WHERE dc_entry_number = ? AND item = ? AND date = ?
-        """, (new_boxes, dc_entry_number, item, old_date.isoformat()))
-    conn.commit()
-    conn.close()
+        c.execute("UPDATE dc_delivery_details SET boxes = ? WHERE delivery_id = ?",
+                  (to_hundredths(new_boxes), delivery_id))
+    _log_change(c, "dc", dc_entry_number)
+    dates = [old_date, new_date.isoformat()] if new_date else [old_date]
+    _refresh_invoice_totals(c, _invoices_covering(c, dates))
 
-def delete_dc_delivery_entry(dc_entry_number, old_date, item):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("""
-        DELETE FROM dc_delivery_details
-        WHERE dc_entry_number = ?
-        AND item = ?
-        AND date = ?
-    """, (dc_entry_number, item, old_date.isoformat()))
-    conn.commit()
-    conn.close()
+@_write_op("dc_delivery_details", "invoices")
+def delete_dc_delivery_entry(c, dc_entry_number, delivery_id):
+    old_date = _check_delivery(c, dc_entry_number, delivery_id)
+    c.execute("DELETE FROM dc_delivery_details WHERE delivery_id = ?", (delivery_id,))
+    _log_change(c, "dc", dc_entry_number)
+    _refresh_invoice_totals(c, _invoices_covering(c, [old_date]))
 
 # ----------------- Invoice Operations -----------------
-def create_invoice(invoice_number, from_date, to_date):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
+@_write_op("invoices")
+def create_invoice(c, invoice_number, from_date, to_date):
     created_at = datetime.now().date().isoformat()  # current date in ISO format (YYYY-MM-DD)
 
     c.execute('''
         INSERT INTO invoices (invoice_number, from_date, to_date, created_at)
         VALUES (?, ?, ?, ?)
     ''', (invoice_number, from_date.isoformat(), to_date.isoformat(), created_at))
-    
-    conn.commit()
-    conn.close()
+    _log_change(c, "invoice", invoice_number)
+    _refresh_invoice_totals(c, [invoice_number])
+
+
+# ----------------- Invoice Totals -----------------
+def _delivery_dates(c, where, params=()):
+    """Distinct dates of the live deliveries matching where (read before they are deleted)."""
+    return [row[0] for row in c.execute(f"SELECT DISTINCT date FROM dc_delivery_details WHERE {where}", params)]
+
+
+def _invoices_covering(c, dates):
+    """Numbers of the invoices whose range includes any of dates (ISO strings)."""
+    numbers = set()
+    for day in set(dates):
+        numbers.update(row[0] for row in c.execute(
+            "SELECT invoice_number FROM invoices WHERE from_date <= ? AND to_date >= ?", (day, day)))
+    return sorted(numbers)
+
+
+def _invoice_totals(conn, from_date, to_date):
+    """(lines, boxes in hundredths, dozens, amount in paise) over every delivery, live or archived, in the range."""
+    query, params = _deliveries_in_range(conn, from_date, to_date)
+    lines = pd.DataFrame(conn.execute(f"SELECT item, boxes FROM ({query})", params).fetchall(),
+                         columns=["item", "boxes"])
+    # Priced line by line with the bill's own rounding, so the stored totals match the printed ones
+    _, dozens, _, amount = catalog.invoice_lines(lines["boxes"] / BOX_SCALE, lines["item"])
+    return len(lines), int(lines["boxes"].sum()), round(float(dozens.sum()), 2), int(amount.sum()) * 100
+
+
+def _refresh_invoice_totals(c, invoice_numbers):
+    """Recompute and store the totals of the given invoices, inside a writer operation."""
+    conn = c.connection
+    for invoice_number in invoice_numbers:
+        row = conn.execute("SELECT from_date, to_date FROM invoices WHERE invoice_number = ?",
+                           (invoice_number,)).fetchone()
+        if row is None:
+            continue
+        totals = _invoice_totals(conn, date.fromisoformat(row[0]), date.fromisoformat(row[1]))
+        conn.execute("""
+            UPDATE invoices SET line_count = ?, total_boxes = ?, total_dozens = ?, total_amount = ?
+            WHERE invoice_number = ?
+        """, (*totals, invoice_number))
+
+
+@_write_op("invoices")
+def refresh_invoice_totals(c, catalog_version=None):
+    """Recompute the stored totals of every invoice and record the catalog version they were priced with."""
+    _refresh_invoice_totals(c, [row[0] for row in c.execute("SELECT invoice_number FROM invoices").fetchall()])
+    if catalog_version is not None:
+        c.execute("INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('invoice_totals_catalog', ?)",
+                  (str(catalog_version),))
+
+
+def _repriced(version):
+    def done(future):
+        global _priced_catalog_version
+        if future.exception() is not None:
+            # Left unrecorded, so the next rerun queues the refresh again
+            print(f"Repricing invoice totals failed: {future.exception()}")
+        else:
+            _priced_catalog_version = version
+    return done
+
+
+def reprice_invoices_if_needed():
+    """
+    Queue refresh_invoice_totals when items.csv has changed since the stored totals were priced
+    (or they have never been). Cheap enough for every rerun: once a catalog version is priced (or
+    found already priced) the database is not read again until items.csv changes.
+    """
+    global _priced_catalog_version, _repricing
+    version = catalog.catalog().version
+    if version == _priced_catalog_version or (_repricing is not None and not _repricing.done()):
+        return
+    with _reader() as conn:
+        row = conn.execute("SELECT value FROM sync_meta WHERE key = 'invoice_totals_catalog'").fetchone()
+    if row is not None and row[0] == str(version):
+        _priced_catalog_version = version
+        return
+    _repricing = refresh_invoice_totals(version)
+    _repricing.add_done_callback(_repriced(version))
 
 
 def get_invoice_delivery_details(invoice_number):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    # Fetch invoice date range
-    c.execute('SELECT from_date, to_date, created_at FROM invoices WHERE invoice_number = ?', (invoice_number,))
-    row = c.fetchone()
+    with _reader() as conn:
+        c = conn.cursor()
+        # Fetch invoice date range
+        c.execute('SELECT from_date, to_date, created_at FROM invoices WHERE invoice_number = ?', (invoice_number,))
+        row = c.fetchone()
     if row is None:
-        conn.close()
         return None, None, pd.DataFrame(), None
     from_date, to_date, created_at = row
     from_date = datetime.fromisoformat(from_date).date()
     to_date = datetime.fromisoformat(to_date).date()
     created_at = datetime.fromisoformat(created_at).date()
-    conn.close()
     # Fetch deliveries in that range
     df = get_dc_delivery_details_with_date_filter(from_date, to_date)
     return from_date, to_date, df, created_at
 
 
 def get_uncompleted_dcs():
-    conn = sqlite3.connect(DB_FILE)
     query = """
         WITH pending_dc AS (
             SELECT r.dc_entry_number, r.item, r.boxes as planned_boxes, 
@@ -288,26 +1060,46 @@ def get_uncompleted_dcs():
                 HAVING delivered_boxes < r.boxes
                 ORDER BY r.dc_entry_number
         )
-        SELECT p.*, t.created_at
+        SELECT p.dc_entry_number, p.item, p.planned_boxes / 100.0 AS planned_boxes,
+               p.delivered_boxes / 100.0 AS delivered_boxes, t.created_at
         FROM pending_dc p
         JOIN dc_entries t
             ON p.dc_entry_number = t.dc_entry_number
         ORDER BY p.dc_entry_number;
     """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    with _reader() as conn:
+        df = pd.read_sql_query(query, conn)
+    return _compact(df, categories=("dc_entry_number", "item"), dates=("created_at",))
+
+
+def invoice_exists(invoice_number):
+    """True if an invoice with this number is saved (a primary-key lookup, cheap enough per keystroke)."""
+    with _reader() as conn:
+        return conn.execute("SELECT 1 FROM invoices WHERE invoice_number = ?", (invoice_number,)).fetchone() is not None
+
+
+def get_invoices_overlapping(from_date, to_date):
+    """Return [(invoice_number, from_date, to_date), ...] for saved invoices sharing any date with the range."""
+    with _reader() as conn:
+        return conn.execute("""
+            SELECT invoice_number, from_date, to_date FROM invoices
+            WHERE from_date <= ? AND to_date >= ?
+            ORDER BY from_date
+        """, (to_date.isoformat(), from_date.isoformat())).fetchall()
 
 
 # ----------------- Fetch All Invoice Numbers -----------------
 def get_all_invoices():
-    """Return a list of all saved invoice numbers with their date ranges."""
-    conn = sqlite3.connect(DB_FILE)
-    # Using sqlite3.Row allows us to access columns by name like a dictionary
-    conn.row_factory = sqlite3.Row 
-    c = conn.cursor()
-    c.execute("SELECT invoice_number, from_date, to_date FROM invoices ORDER BY invoice_number DESC")
-    rows = c.fetchall()
-    conn.close()
+    """Return a list of all saved invoices with their date ranges and stored totals (boxes, dozens, rupees)."""
+    with _reader() as conn:
+        # Using sqlite3.Row allows us to access columns by name like a dictionary
+        c = conn.cursor()
+        c.row_factory = sqlite3.Row
+        c.execute("""
+            SELECT invoice_number, from_date, to_date, created_at, line_count,
+                   total_boxes / 100.0 AS total_boxes, total_dozens, total_amount / 100.0 AS total_amount
+            FROM invoices ORDER BY invoice_number DESC
+        """)
+        rows = c.fetchall()
     # Convert rows to a list of dictionaries
     return [dict(row) for row in rows]
\ No newline at end of file
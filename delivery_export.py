@@ -0,0 +1,146 @@
+"""
+Streaming export of priced deliveries for accounting extracts.
+
+Rows are read from the database a chunk at a time (live and archived DCs) and written out as
+they arrive, so memory use stays flat however many years the range covers.
+
+    python delivery_export.py --from 2024-04-01 --to 2026-03-31 --format csv --out deliveries.csv
+    python delivery_export.py --from 2024-04-01 --to 2026-03-31 --format parquet --out deliveries/
+"""
+import argparse
+import csv
+import io
+import os
+from datetime import datetime
+from itertools import groupby
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import catalog
+from db import init_db, iter_dc_deliveries, amount_paise, BOX_SCALE
+
+EXPORT_CHUNK_ROWS = 5000
+CSV_HEADER = ["Date", "DC No", "Item", "Boxes", "Pack Mode", "Dozens", "Amount"]
+
+# Item and DC number repeat on almost every row, so they are stored dictionary-encoded
+PARQUET_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("dc_entry_number", pa.dictionary(pa.int32(), pa.string())),
+    ("item", pa.dictionary(pa.int16(), pa.string())),
+    ("boxes", pa.float64()),
+    ("packing_mode", pa.int16()),
+    ("dozens", pa.float64()),
+    ("amount", pa.float64()),
+])
+
+
+# ----------------- Pricing -----------------
+def _priced(rows):
+    # Same figures as the statistics tab: Dozens = boxes * pack mode / 12, Amount = Dozens * rate,
+    # with the amount worked out exactly in paise from the stored hundredths
+    for dc_entry_number, date_iso, item, hundredths in rows:
+        entry = catalog.lookup(item)
+        mode, rate = (entry.pieces_per_box, entry.rate_per_dozen) if entry is not None else (0, 0)
+        paise = amount_paise(hundredths, mode, rate)
+        yield (date_iso, dc_entry_number, item, hundredths / BOX_SCALE, mode,
+               hundredths * mode / (12 * BOX_SCALE), paise / 100)
+
+
+# ----------------- CSV -----------------
+def write_deliveries_csv(from_date, to_date, out, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write priced deliveries in the range as CSV to a text file object. Returns the row count."""
+    writer = csv.writer(out)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for rows in iter_dc_deliveries(from_date, to_date, chunk_rows):
+        writer.writerows(
+            (datetime.strptime(date_iso, "%Y-%m-%d").strftime("%d-%m-%Y"), dc, item, boxes, mode, dozens, amount)
+            for date_iso, dc, item, boxes, mode, dozens, amount in _priced(rows)
+        )
+        count += len(rows)
+    return count
+
+
+def deliveries_csv_bytes(from_date, to_date):
+    """The CSV export as bytes, for st.download_button."""
+    buffer = io.StringIO()
+    write_deliveries_csv(from_date, to_date, buffer)
+    return buffer.getvalue().encode("utf-8")
+
+
+# ----------------- Parquet -----------------
+def _arrow_chunk(rows):
+    columns = list(zip(*_priced(rows)))
+    return pa.table([
+        pa.array([datetime.strptime(d, "%Y-%m-%d").date() for d in columns[0]], pa.date32()),
+        pa.array(columns[1], pa.string()).dictionary_encode().cast(PARQUET_SCHEMA.field("dc_entry_number").type),
+        pa.array(columns[2], pa.string()).dictionary_encode().cast(PARQUET_SCHEMA.field("item").type),
+        pa.array(columns[3], pa.float64()),
+        pa.array(columns[4], pa.int16()),
+        pa.array(columns[5], pa.float64()),
+        pa.array(columns[6], pa.float64()),
+    ], schema=PARQUET_SCHEMA)
+
+
+def write_deliveries_parquet(from_date, to_date, out, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write priced deliveries in the range to one Parquet file (path or binary file object). Returns the row count."""
+    count = 0
+    with pq.ParquetWriter(out, PARQUET_SCHEMA) as writer:
+        for rows in iter_dc_deliveries(from_date, to_date, chunk_rows):
+            writer.write_table(_arrow_chunk(rows))
+            count += len(rows)
+    return count
+
+
+def deliveries_parquet_bytes(from_date, to_date):
+    """The single-file Parquet export as bytes, for st.download_button."""
+    buffer = io.BytesIO()
+    write_deliveries_parquet(from_date, to_date, buffer)
+    return buffer.getvalue()
+
+
+def write_deliveries_parquet_dataset(from_date, to_date, out_dir, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Write priced deliveries as a Parquet dataset partitioned by month (out_dir/year=YYYY/month=MM/).
+
+    Rows arrive in date order, so only one partition file is open at a time. Returns the row count.
+    """
+    count = 0
+    writer, partition = None, None
+    try:
+        for rows in iter_dc_deliveries(from_date, to_date, chunk_rows):
+            # A chunk can span a month boundary, so it is split on the month
+            for month, month_rows in groupby(rows, key=lambda row: row[1][:7]):
+                if month != partition:
+                    if writer is not None:
+                        writer.close()
+                    partition = month
+                    part_dir = os.path.join(out_dir, f"year={month[:4]}", f"month={month[5:7]}")
+                    os.makedirs(part_dir, exist_ok=True)
+                    writer = pq.ParquetWriter(os.path.join(part_dir, "part-0.parquet"), PARQUET_SCHEMA)
+                writer.write_table(_arrow_chunk(list(month_rows)))
+            count += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="from_date", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="to_date", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--out", required=True, help="CSV file, or folder for the partitioned Parquet dataset")
+    args = parser.parse_args()
+
+    init_db()
+    from_date = datetime.strptime(args.from_date, "%Y-%m-%d").date()
+    to_date = datetime.strptime(args.to_date, "%Y-%m-%d").date()
+    if args.format == "csv":
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            count = write_deliveries_csv(from_date, to_date, f)
+    else:
+        count = write_deliveries_parquet_dataset(from_date, to_date, args.out)
+    print(f"Exported {count} deliveries to {args.out}")
@@ -0,0 +1,171 @@
+"""
+In-memory columnar copy of every delivery, shared by all sessions of the app process.
+
+Deliveries are held as NumPy arrays sorted by day (day number, item code, DC code, boxes in
+integer hundredths), so a
+date range is two binary searches and item / DC filters and totals are vectorized over that slice.
+The store loads once and then follows writes: when dc_delivery_details changes, only the DCs whose
+sync_changes sequence moved are re-read and spliced in.
+"""
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import catalog
+import db
+
+EPOCH = date(1970, 1, 1).toordinal()
+ALL_DATES = (date(1900, 1, 1), date(9999, 12, 31))
+
+_lock = threading.Lock()
+_warm_lock = threading.Lock()
+# (day, item, dc, boxes) arrays, swapped as a whole so readers never see a half-applied refresh
+_columns = None
+_item_names = list(catalog.item_names())
+_item_codes = {name: code for code, name in enumerate(_item_names)}
+_dc_names = []
+_dc_codes = {}
+_seq = 0
+_generation = None
+_warm_thread = None
+
+
+# ----------------- Encoding -----------------
+def _code(name, names, codes):
+    code = codes.get(name)
+    if code is None:
+        code = codes[name] = len(names)
+        names.append(name)
+    return code
+
+
+def _encode(rows):
+    """(dc_entry_number, date, item, boxes) rows -> column arrays (not yet sorted)."""
+    day = np.fromiter((date.fromisoformat(r[1]).toordinal() - EPOCH for r in rows), np.int32, len(rows))
+    item = np.fromiter((_code(r[2], _item_names, _item_codes) for r in rows), np.int16, len(rows))
+    dc = np.fromiter((_code(r[0], _dc_names, _dc_codes) for r in rows), np.int32, len(rows))
+    boxes = np.fromiter((r[3] for r in rows), np.int32, len(rows))
+    return day, item, dc, boxes
+
+
+def _day(d):
+    return d.toordinal() - EPOCH
+
+
+# ----------------- Loading -----------------
+def _open():
+    # Its own connection (never a page's pinned snapshot), with every archive attached before BEGIN
+    conn = db._connect()
+    conn.isolation_level = None
+    db._attach_archives(conn, [row[0] for row in conn.execute("SELECT archive_year FROM archive_files")])
+    conn.execute("BEGIN")
+    return conn
+
+
+def _load():
+    global _columns, _seq, _generation
+    generation = db._committed_generation("dc_delivery_details")
+    conn = _open()
+    try:
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sync_changes").fetchone()[0]
+        query, params = db._deliveries_in_range(conn, *ALL_DATES, order="ASC")
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+    _columns = _encode(rows)
+    _seq, _generation = seq, generation
+
+
+def _refresh():
+    """Re-read only the DCs changed since the last load and splice them into the sorted arrays."""
+    global _columns, _seq, _generation
+    generation = db._committed_generation("dc_delivery_details")
+    conn = _open()
+    try:
+        changed = conn.execute("SELECT key, seq FROM sync_changes WHERE kind = 'dc' AND seq > ?", (_seq,)).fetchall()
+        rows = []
+        for dc_entry_number, _ in changed:
+            source = db._dc_source(conn, dc_entry_number)
+            rows += conn.execute(
+                f"SELECT dc_entry_number, date, item, boxes FROM {source}.dc_delivery_details WHERE dc_entry_number = ?",
+                (dc_entry_number,)
+            ).fetchall()
+    finally:
+        conn.close()
+
+    day, item, dc, boxes = _columns
+    if changed:
+        changed_codes = np.array([_code(key, _dc_names, _dc_codes) for key, _ in changed], np.int32)
+        keep = ~np.isin(dc, changed_codes)
+        day, item, dc, boxes = day[keep], item[keep], dc[keep], boxes[keep]
+    if rows:
+        rows.sort(key=lambda r: r[1])
+        new_day, new_item, new_dc, new_boxes = _encode(rows)
+        # Positions in the existing sorted day array; np.insert keeps the whole thing sorted
+        at = np.searchsorted(day, new_day, side="right")
+        day, item, dc, boxes = (np.insert(day, at, new_day), np.insert(item, at, new_item),
+                                np.insert(dc, at, new_dc), np.insert(boxes, at, new_boxes))
+    _columns = (day, item, dc, boxes)
+    _seq = max([_seq] + [seq for _, seq in changed])
+    _generation = generation
+
+
+def _current():
+    """The column arrays, loading them on first use and catching up on committed writes."""
+    with _lock:
+        if _columns is None:
+            _load()
+        elif db._committed_generation("dc_delivery_details") != _generation:
+            _refresh()
+        return _columns
+
+
+def warm_up():
+    """Load the store in the background, once per process, so the first statistics page does not wait."""
+    global _warm_thread
+    with _warm_lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=_current, name="delivery-store-load", daemon=True)
+            _warm_thread.start()
+
+
+# ----------------- Queries -----------------
+def _select(from_date, to_date, item=None, dc_entry_number=None):
+    day, item_col, dc_col, boxes = _current()
+    lo = np.searchsorted(day, _day(from_date), side="left")
+    hi = np.searchsorted(day, _day(to_date), side="right")
+    columns = day[lo:hi], item_col[lo:hi], dc_col[lo:hi], boxes[lo:hi]
+    mask = None
+    if item is not None:
+        mask = columns[1] == _item_codes.get(item, -1)
+    if dc_entry_number is not None:
+        dc_mask = columns[2] == _dc_codes.get(dc_entry_number, -1)
+        mask = dc_mask if mask is None else mask & dc_mask
+    if mask is not None:
+        columns = tuple(col[mask] for col in columns)
+    return columns
+
+
+def get_deliveries(from_date, to_date, item=None, dc_entry_number=None):
+    """
+    Deliveries in the range, optionally for one item and/or DC, oldest first.
+
+    Same columns and dtypes as db.get_dc_delivery_details_with_date_filter.
+    """
+    day, item_col, dc_col, boxes = _select(from_date, to_date, item, dc_entry_number)
+    return pd.DataFrame({
+        "dc_entry_number": pd.Categorical.from_codes(dc_col, categories=list(_dc_names)),
+        "date": (day.astype("int64") * 86400).astype("datetime64[s]"),
+        "item": pd.Categorical.from_codes(item_col, categories=list(_item_names)),
+        "boxes": boxes / db.BOX_SCALE,
+    })
+
+
+def get_item_totals(from_date, to_date):
+    """Total boxes per item in the range, as {item: boxes}, with one bincount over the slice."""
+    _, item_col, _, boxes = _select(from_date, to_date)
+    # Integer hundredths summed as float64 are exact far beyond any realistic total
+    totals = np.bincount(item_col, weights=boxes, minlength=len(_item_names))
+    return {_item_names[code]: float(totals[code]) / db.BOX_SCALE for code in np.flatnonzero(totals)}
@@ -0,0 +1,174 @@
+"""
+Data checks over the live database, run nightly by the app and on demand.
+
+Each check is one set-based query over the whole database (no per-DC loops):
+
+    over_delivered     an item has more boxes delivered than planned on its DC
+    orphan_row         a DC row whose DC entry is missing
+    orphan_delivery    a delivery for an item that is not on its DC
+    unknown_item       an item name on DCs or deliveries that is not in the item catalog
+    invoice_overlap    two invoices cover some of the same dates
+    uninvoiced         deliveries older than UNINVOICED_AFTER_DAYS that no invoice covers
+
+A scan replaces the stored list of problems, which the Update DC tab shows.
+
+    python integrity.py        scan now and print what was found
+"""
+import argparse
+import threading
+import time
+from datetime import datetime, date, timedelta
+
+import catalog
+import db
+
+UNINVOICED_AFTER_DAYS = 45
+# The nightly scan runs at this hour; a scan older than SCAN_STALE_HOURS is redone at startup
+SCAN_HOUR = 2
+SCAN_STALE_HOURS = 20
+
+CHECK_TITLES = {
+    "over_delivered": "Delivered more than planned",
+    "orphan_row": "DC row without a DC",
+    "orphan_delivery": "Delivery for an item not on the DC",
+    "unknown_item": "Item not in the item catalog",
+    "invoice_overlap": "Invoices with overlapping dates",
+    "uninvoiced": f"Deliveries older than {UNINVOICED_AFTER_DAYS} days not in any invoice",
+}
+
+_scheduler_thread = None
+_scheduler_lock = threading.Lock()
+
+
+# ----------------- Checks -----------------
+def _boxes(hundredths):
+    return f"{hundredths / db.BOX_SCALE:.2f}"
+
+
+def find_issues(today=None):
+    """Run every check against one snapshot. Returns [(check_name, dc_entry_number, item, detail), ...]."""
+    cutoff = (today or date.today()) - timedelta(days=UNINVOICED_AFTER_DAYS)
+    issues = []
+    with db.read_snapshot() as conn:
+        for dc_entry_number, item, planned, delivered in conn.execute("""
+            SELECT r.dc_entry_number, r.item, r.boxes, d.delivered
+            FROM dc_rows r
+            JOIN (SELECT dc_entry_number, item, SUM(boxes) AS delivered
+                  FROM dc_delivery_details GROUP BY dc_entry_number, item) d
+                ON d.dc_entry_number = r.dc_entry_number AND d.item = r.item
+            WHERE d.delivered > r.boxes
+            ORDER BY r.dc_entry_number, r.item
+        """):
+            issues.append(("over_delivered", dc_entry_number, item,
+                           f"planned {_boxes(planned)} boxes, delivered {_boxes(delivered)}"))
+
+        for dc_entry_number, item in conn.execute("""
+            SELECT r.dc_entry_number, r.item FROM dc_rows r
+            WHERE NOT EXISTS (SELECT 1 FROM dc_entries e WHERE e.dc_entry_number = r.dc_entry_number)
+            ORDER BY r.dc_entry_number, r.item
+        """):
+            issues.append(("orphan_row", dc_entry_number, item, "the DC entry does not exist"))
+
+        for dc_entry_number, item, count, boxes in conn.execute("""
+            SELECT d.dc_entry_number, d.item, COUNT(*), SUM(d.boxes) FROM dc_delivery_details d
+            WHERE NOT EXISTS (SELECT 1 FROM dc_rows r
+                              WHERE r.dc_entry_number = d.dc_entry_number AND r.item = d.item)
+            GROUP BY d.dc_entry_number, d.item
+            ORDER BY d.dc_entry_number, d.item
+        """):
+            issues.append(("orphan_delivery", dc_entry_number, item,
+                           f"{count} deliveries, {_boxes(boxes)} boxes"))
+
+        for item, rows in conn.execute("""
+            SELECT item, COUNT(*) FROM (SELECT item FROM dc_rows UNION ALL SELECT item FROM dc_delivery_details)
+            GROUP BY item ORDER BY item
+        """):
+            if catalog.lookup(item) is None:
+                issues.append(("unknown_item", None, item, f"on {rows} DC rows and deliveries, priced at 0"))
+
+        for first, second, overlap_from, overlap_to in conn.execute("""
+            SELECT a.invoice_number, b.invoice_number, MAX(a.from_date, b.from_date), MIN(a.to_date, b.to_date)
+            FROM invoices a
+            JOIN invoices b ON a.invoice_number < b.invoice_number
+                           AND a.from_date <= b.to_date AND b.from_date <= a.to_date
+            ORDER BY a.invoice_number, b.invoice_number
+        """):
+            issues.append(("invoice_overlap", None, None,
+                           f"{first} and {second} both cover {overlap_from} to {overlap_to}"))
+
+        for dc_entry_number, count, first_date, boxes in conn.execute("""
+            SELECT d.dc_entry_number, COUNT(*), MIN(d.date), SUM(d.boxes) FROM dc_delivery_details d
+            WHERE d.date < ?
+              AND NOT EXISTS (SELECT 1 FROM invoices i WHERE d.date BETWEEN i.from_date AND i.to_date)
+            GROUP BY d.dc_entry_number
+            ORDER BY MIN(d.date), d.dc_entry_number
+        """, (cutoff.isoformat(),)):
+            issues.append(("uninvoiced", dc_entry_number, None,
+                           f"{count} deliveries ({_boxes(boxes)} boxes) since {first_date}"))
+    return issues
+
+
+# ----------------- Reports -----------------
+@db._write_op("integrity_issues")
+def _save_report(c, run_at, issues):
+    c.execute("DELETE FROM integrity_issues")
+    c.executemany("INSERT INTO integrity_issues (check_name, dc_entry_number, item, detail) VALUES (?, ?, ?, ?)",
+                  issues)
+    c.execute("INSERT OR REPLACE INTO integrity_runs (run_at, issues) VALUES (?, ?)", (run_at, len(issues)))
+
+
+def scan_now():
+    """Run the checks and store the result as the latest report. Returns the issues found."""
+    issues = find_issues()
+    _save_report(datetime.now().isoformat(timespec="seconds"), issues).result()
+    return issues
+
+
+def latest_report():
+    """Return (time of the latest scan or None, [(check_name, dc_entry_number, item, detail), ...])."""
+    with db._reader() as conn:
+        run = conn.execute("SELECT MAX(run_at) FROM integrity_runs").fetchone()[0]
+        issues = conn.execute("SELECT check_name, dc_entry_number, item, detail FROM integrity_issues "
+                              "ORDER BY rowid").fetchall()
+    return (datetime.fromisoformat(run) if run else None), issues
+
+
+# ----------------- Scheduler -----------------
+def _seconds_until_scan(now):
+    next_scan = now.replace(hour=SCAN_HOUR, minute=0, second=0, microsecond=0)
+    if next_scan <= now:
+        next_scan += timedelta(days=1)
+    return (next_scan - now).total_seconds()
+
+
+def _scheduler_loop():
+    while True:
+        try:
+            last_run, _ = latest_report()
+            if last_run is None or datetime.now() - last_run > timedelta(hours=SCAN_STALE_HOURS):
+                scan_now()
+        except Exception as e:
+            print(f"Scheduled data check failed: {e}")
+        time.sleep(_seconds_until_scan(datetime.now()))
+
+
+def start_integrity_scheduler():
+    """Start the nightly scan thread once per process; safe to call on every Streamlit rerun."""
+    global _scheduler_thread
+    with _scheduler_lock:
+        if _scheduler_thread is None:
+            _scheduler_thread = threading.Thread(target=_scheduler_loop, name="db-integrity", daemon=True)
+            _scheduler_thread.start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    db.init_db()
+    issues = scan_now()
+    if not issues:
+        print("No problems found.")
+    for check_name, dc_entry_number, item, detail in issues:
+        where = " / ".join(part for part in (dc_entry_number and f"DC {dc_entry_number}", item) if part)
+        print(f"{CHECK_TITLES[check_name]}: {where + ': ' if where else ''}{detail}")
@@ -0,0 +1,98 @@
+from html import escape
+
+from invoice_pdf import (
+    print_cols,
+    col_widths,
+    footer_texts,
+    pan_text,
+    mobile_text,
+    invoice_title,
+    seller_name,
+    seller_address,
+    party_lines,
+    party_details,
+    load_invoice,
+)
+
+# Same A4 sheet, border and Times font as the PDF, sized for browser printing
+PRINT_CSS = """
+@page { size: A4; margin: 12mm; }
+body { font-family: "Times New Roman", Times, serif; font-size: 12pt; margin: 0; color: #000; }
+.sheet { border: 0.2mm solid #000; padding: 6px 8px; max-width: 190mm; margin: 0 auto; }
+.row { display: flex; justify-content: space-between; }
+.center { text-align: center; }
+.title { font-size: 14pt; margin-top: 4px; }
+.bill { border: 0.5pt solid #000; font-weight: bold; padding: 1px 2px; margin: 8px 0; }
+.party { display: flex; justify-content: space-between; margin-bottom: 10px; }
+.party .left div + div { padding-left: 35px; }
+.party .right { text-align: center; padding-right: 40px; }
+table.items { border-collapse: collapse; margin: 0 auto; table-layout: fixed; }
+table.items th, table.items td { border: 0.5pt solid #000; text-align: center; padding: 2px 3px; }
+table.items thead { display: table-header-group; background: lightgrey; }
+table.items tr { page-break-inside: avoid; }
+table.items tr.total td { font-size: 13pt; }
+table.items tr.total td.bold { font-weight: bold; }
+.footer { margin-top: 10px; }
+.footer .row { padding: 3px 0; }
+@media print { .sheet { border: none; } }
+"""
+
+
+# ----------------- HTML Rendering -----------------
+def render_invoice_html(invoice_number, invoice_date_str, df):
+    """Render the JOB INVOICE layout of the PDF as a self-contained HTML document with print CSS."""
+    grand_total = df["Amount"].sum()
+    total_dozens = round(df["Dozens"].sum(), 2)
+
+    colgroup = "".join(f'<col style="width:{w * 1.25:.0f}px">' for w in col_widths)
+    head = "".join(f"<th>{escape(c)}</th>" for c in print_cols)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{escape(str(v))}</td>" for v in row) + "</tr>"
+        for row in df[print_cols].itertuples(index=False, name=None)
+    )
+    total = (
+        '<tr class="total"><td class="bold" colspan="6">GRAND TOTAL</td>'
+        f'<td>{total_dozens}</td><td></td><td class="bold">{grand_total}</td></tr>'
+    )
+    footer = "".join(
+        f'<div class="row"><span>{escape(left)}</span><span>{escape(right)}</span></div>'
+        for left, right in footer_texts
+    )
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Invoice {escape(str(invoice_number))}</title>
+<style>{PRINT_CSS}</style>
+</head>
+<body>
+<div class="sheet">
+  <div class="row"><span>{escape(pan_text)}</span><span>{escape(mobile_text)}</span></div>
+  <div class="center title">{escape(invoice_title)}</div>
+  <div class="center">{escape(seller_name)}</div>
+  <div class="center">{escape(seller_address)}</div>
+  <div class="row bill"><span>Bill No: {escape(str(invoice_number))}</span><span>Date: {escape(invoice_date_str)}</span></div>
+  <div class="party">
+    <div class="left">{"".join(f"<div>{escape(line)}</div>" for line in party_lines)}</div>
+    <div class="right">{"".join(f"<div>{escape(line)}</div>" for line in party_details)}</div>
+  </div>
+  <table class="items">
+    <colgroup>{colgroup}</colgroup>
+    <thead><tr>{head}</tr></thead>
+    <tbody>{body}{total}</tbody>
+  </table>
+  <div class="footer">{footer}</div>
+</div>
+</body>
+</html>
+"""
+
+
+def build_invoice_html(invoice_number):
+    """Fetch, price and render one saved invoice as HTML. Returns None when it has no deliveries."""
+    loaded = load_invoice(invoice_number)
+    if loaded is None:
+        return None
+    invoice_date_str, df = loaded
+    return render_invoice_html(invoice_number, invoice_date_str, df)
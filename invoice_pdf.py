@@ -0,0 +1,346 @@
+import hashlib
+import os
+import re
+from io import BytesIO
+from itertools import islice
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Table, TableStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+import catalog
+from config import PDF_CACHE_DIR
+from db import get_invoice_delivery_details
+
+# Bump whenever the layout below changes so stale cached PDFs are not served.
+TEMPLATE_VERSION = "2"
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+
+# Vertical band the item table is laid out in; the footer lines sit below it
+TABLE_TOP = PAGE_HEIGHT - 54 - 140
+TABLE_BOTTOM = 54 + 140
+
+FOOTER_TOP = TABLE_BOTTOM - 20
+FOOTER_LINE_HEIGHT = 22
+FOOTER_LEFT = 54
+FOOTER_RIGHT = PAGE_WIDTH - 54
+
+# Letterhead and party block, shared by the PDF and HTML renderers
+pan_text = "PAN No: DJOPB0004F"
+mobile_text = "Mob: 8825766745"
+invoice_title = "JOB INVOICE"
+seller_name = "SHAHANAZ BANU"
+seller_address = "No : 39/16/2, Nayar vardha Pillai Street, Royapettah, Chennai - 600014"
+party_lines = ["Party : SINGHI TEXTORIUM", "No : 145, G.N. Street,", "Chennai - 600001."]
+party_details = ["GSTIN : 33AAAFS8731L1Z0", "Transport: Own", "Apply Reverse Charges Yes/No"]
+
+print_cols = ["Sl.no", "DC No", "Date", "Pack Mode", "Units", "Particular", "Dozens", "Rate", "Amount"]
+
+# column widths
+col_widths = [30, 40, 65, 60, 34, 150, 46, 28, 42]
+
+# ✅ PERFECT-ALIGN FOOTER WITH RIGHT-SIDE PRINT
+footer_texts = [
+    ["1. Handkerchiefs Goods 6213", "For SHAHANAZ BANU"],
+    ["2. Packing of Handkerchiefs Not for sale", ""],
+    ["3. Good Against party DC and Date                    ________________________", ""],
+    ["4. SAC Code: 9988                                              ________________________", ""],
+    ["5. GST will be paid by Principle                          ________________________", ""],
+    ["Below 20 Lacs Unregistered Manufacturer         ________________________", ""]
+]
+
+_fonts = None
+_template = None
+
+
+# ----------------- Fonts -----------------
+def register_fonts():
+    """Register Times New Roman once per process and return (base_font, bold_font)."""
+    global _fonts
+    if _fonts is None:
+        # Try to register Times New Roman (if available), otherwise fallback to built-ins
+        try:
+            pdfmetrics.registerFont(TTFont('TimesNewRoman', 'Times New Roman.ttf'))
+            pdfmetrics.registerFont(TTFont('TimesNewRoman-Bold', 'Times New Roman Bold.ttf'))
+            _fonts = ('TimesNewRoman', 'TimesNewRoman-Bold')
+        except Exception:
+            _fonts = ('Times-Roman', 'Times-Bold')
+    return _fonts
+
+
+# ----------------- Static Template -----------------
+def _get_template():
+    """Build the parts of the invoice that never change (table styles and row heights) once."""
+    global _template
+    if _template is None:
+        base_font, bold_font = register_fonts()
+
+        table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('FONTNAME', (0, 0), (-1, -1), base_font),
+            ('FONTSIZE', (0, 0), (-1, -1), 12),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ])
+
+        # Grand total styling addresses the last row with negative indices, so one style fits any page
+        total_style = TableStyle([
+            ('SPAN', (0, -1), (5, -1)),
+            ('ALIGN', (8, -1), (8, -1), 'CENTER'),
+            ('FONTSIZE', (0, -1), (8, -1), 13),
+            ('FONTNAME', (0, -1), (0, -1), bold_font),
+            ('FONTNAME', (8, -1), (8, -1), bold_font),
+        ])
+
+        # Measure the header, body and total row heights once; pagination is computed from these
+        sample = Table([print_cols, print_cols, print_cols], colWidths=col_widths)
+        sample.setStyle(table_style)
+        sample.setStyle(total_style)
+        sample.wrap(PAGE_WIDTH, PAGE_HEIGHT)
+        header_h, row_h, total_h = sample._rowHeights
+
+        _template = {
+            "table_style": table_style,
+            "total_style": total_style,
+            "header_h": header_h,
+            "row_h": row_h,
+            "total_h": total_h,
+        }
+    return _template
+
+
+def _draw_static_header(canvas, base_font):
+    width, height = A4
+    margin = 50
+
+    # Outer border
+    border_thickness_mm = 0.20
+    border_thickness_pts = border_thickness_mm * 72 / 25.4
+    canvas.setLineWidth(border_thickness_pts)
+    canvas.setStrokeColor(colors.black)
+    canvas.rect(margin, margin, width - 2 * margin, height - 1.5 * margin)
+
+    y_top = height - margin
+    canvas.setFont(base_font, 12)
+    canvas.drawString(margin + 2, y_top, pan_text)
+    canvas.drawRightString(width - margin - 2, y_top, mobile_text)
+
+    canvas.setFont(base_font, 14)
+    canvas.drawCentredString(width / 2.0, y_top - 20, invoice_title)
+
+    canvas.setFont(base_font, 12)
+    canvas.drawCentredString(width / 2.0, y_top - 40, seller_name)
+    canvas.drawCentredString(width / 2.0, y_top - 55, seller_address)
+
+    # Box around Bill No & Date
+    bill_date_y = y_top - 75
+    canvas.setLineWidth(0.5)
+    canvas.rect(margin, bill_date_y - 2, width - 2 * margin, 15, stroke=1, fill=0)
+
+    # Party Info
+    y_party = y_top - 95
+    canvas.setFont(base_font, 12)
+    canvas.drawString(margin + 2, y_party, party_lines[0])
+    canvas.drawString(margin + 37, y_party - 15, party_lines[1])
+    canvas.drawString(margin + 37, y_party - 30, party_lines[2])
+    canvas.drawCentredString((width / 2.0) + 72, y_party, party_details[0])
+    canvas.drawCentredString((width / 2.0) + 50, y_party - 15, party_details[1])
+    canvas.drawCentredString((width / 2.0) + 124, y_party - 30, party_details[2])
+
+    # ✅ PERFECT-ALIGN FOOTER WITH RIGHT-SIDE PRINT
+    y = FOOTER_TOP
+    for left_text, right_text in footer_texts:
+        canvas.drawString(FOOTER_LEFT, y, left_text)
+        if right_text:
+            canvas.drawRightString(FOOTER_RIGHT, y, right_text)
+        y -= FOOTER_LINE_HEIGHT
+
+
+def _draw_page(canvas, invoice_number, invoice_date_str):
+    """Page callback: static header/footer (recorded once per document as a form) plus Bill No & Date."""
+    base_font, bold_font = register_fonts()
+    canvas.saveState()
+    if not canvas.hasForm("invoice_page"):
+        canvas.beginForm("invoice_page")
+        _draw_static_header(canvas, base_font)
+        canvas.endForm()
+    canvas.doForm("invoice_page")
+
+    # Bill No & Date in bold
+    width, height = A4
+    margin = 50
+    bill_date_y = height - margin - 75
+    canvas.setFont(bold_font, 12)
+    canvas.drawString(margin + 2, bill_date_y, f"Bill No: {invoice_number}")
+    canvas.drawRightString(width - margin - 2, bill_date_y, f"Date: {invoice_date_str}")
+    canvas.restoreState()
+
+
+# ----------------- Invoice Data -----------------
+def prepare_invoice_df(df):
+    """Add Sl.no, Pack Mode, Dozens, Rate, Amount and Units to invoice deliveries and rename for print."""
+    df.insert(0, "Sl.no", range(1, len(df) + 1))
+
+    # Compute Packing Mode, Dozens, Rate, Amount (item is categorical, so each lookup runs once per item)
+    df["Pack Mode"], df["Dozens"], df["Rate"], df["Amount"] = catalog.invoice_lines(df["boxes"], df["item"])
+
+    # Units: convert to int when whole numbers (remove .0)
+    def display_units(u):
+        try:
+            if isinstance(u, float) and u.is_integer():
+                return int(u)
+            return u
+        except:
+            return u
+    df["Units"] = df["boxes"].apply(lambda x: display_units(x))
+
+    df["date"] = df["date"].dt.strftime("%d-%m-%Y")
+
+    # Rename for print
+    df.rename(columns={
+        "dc_entry_number": "DC No",
+        "date": "Date",
+        "item": "Particular"
+    }, inplace=True)
+    return df
+
+
+def invoice_hash(invoice_number, invoice_date_str, df):
+    """Hash everything that ends up on the printed invoice: lines, rates and the template version."""
+    h = hashlib.sha256()
+    h.update(f"{TEMPLATE_VERSION}|{invoice_number}|{invoice_date_str}".encode("utf-8"))
+    for row in df[print_cols].itertuples(index=False):
+        h.update(("\x1f".join(str(v) for v in row) + "\x1e").encode("utf-8"))
+    return h.hexdigest()
+
+
+# ----------------- PDF Rendering -----------------
+def _page_chunks(rows, rows_per_page, last_page_rows):
+    """
+    Yield (page_rows, is_last_page) from a row iterator, holding at most one page of rows.
+
+    The last page must also fit the grand total row, so it takes at most last_page_rows rows.
+    """
+    page = list(islice(rows, rows_per_page))
+    while True:
+        # Look ahead one row to know whether this is the last page
+        next_row = next(rows, None)
+        if next_row is None:
+            break
+        yield page, False
+        page = [next_row] + list(islice(rows, rows_per_page - 1))
+
+    if len(page) > last_page_rows:
+        # Not enough room left for the grand total: carry the tail over to a final page
+        split = max(1, last_page_rows)
+        yield page[:split], False
+        page = page[split:]
+    yield page, True
+
+
+def render_invoice_pdf(invoice_number, invoice_date_str, df, progress=None):
+    """
+    Lay out the invoice page by page onto a canvas and return the PDF bytes.
+
+    Only one page of rows is materialised at a time and rows per page are derived from the measured
+    row heights, so time and memory grow linearly with the number of lines. progress, if given, is
+    called as progress(rows_done, total_rows) after each page.
+    """
+    template = _get_template()
+
+    pdf_buffer = BytesIO()
+    canvas = Canvas(pdf_buffer, pagesize=A4)
+
+    grand_total = df["Amount"].sum()
+    total_dozens = round(df["Dozens"].sum(), 2)
+    total_row = ["GRAND TOTAL", "", "", "", "", "", total_dozens, "", grand_total]
+
+    available = TABLE_TOP - TABLE_BOTTOM - template["header_h"]
+    rows_per_page = max(1, int(available // template["row_h"]))
+    last_page_rows = max(0, int((available - template["total_h"]) // template["row_h"]))
+
+    table_width = sum(col_widths)
+    x = (PAGE_WIDTH - table_width) / 2.0
+    total_rows = len(df)
+    rows_done = 0
+
+    rows = df[print_cols].itertuples(index=False, name=None)
+    for page_rows, is_last_page in _page_chunks(rows, rows_per_page, last_page_rows):
+        _draw_page(canvas, invoice_number, invoice_date_str)
+
+        table_data = [print_cols] + page_rows
+        if is_last_page:
+            table_data.append(total_row)
+
+        table = Table(table_data, colWidths=col_widths)
+        table.setStyle(template["table_style"])
+        if is_last_page:
+            table.setStyle(template["total_style"])
+
+        _, table_h = table.wrapOn(canvas, table_width, available)
+        table.drawOn(canvas, x, TABLE_TOP - table_h)
+        canvas.showPage()
+
+        rows_done += len(page_rows)
+        if progress:
+            progress(rows_done, total_rows)
+
+    canvas.save()
+    return pdf_buffer.getvalue()
+
+
+def _cache_prefix(invoice_number):
+    # Sanitized number for readability plus a hash of the raw one, so numbers that sanitize
+    # alike ("INV/1", "INV 1") never share a prefix and evict each other's renders
+    raw = str(invoice_number)
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", raw)
+    return f"{safe}_{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:8]}_"
+
+
+def _cache_path(invoice_number, digest):
+    return os.path.join(PDF_CACHE_DIR, f"{_cache_prefix(invoice_number)}{digest[:16]}.pdf")
+
+
+def get_invoice_pdf(invoice_number, invoice_date_str, df, progress=None):
+    """Return the invoice PDF, reading it from the disk cache when the invoice has not changed."""
+    path = _cache_path(invoice_number, invoice_hash(invoice_number, invoice_date_str, df))
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    pdf_bytes = render_invoice_pdf(invoice_number, invoice_date_str, df, progress=progress)
+
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    # Drop renders of earlier versions of this invoice
+    prefix = _cache_prefix(invoice_number)
+    for name in os.listdir(PDF_CACHE_DIR):
+        if name.startswith(prefix) and name.endswith(".pdf") and len(name) == len(prefix) + 20:
+            os.remove(os.path.join(PDF_CACHE_DIR, name))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, path)
+    return pdf_bytes
+
+
+def load_invoice(invoice_number):
+    """Fetch and price one saved invoice for print. Returns (invoice_date_str, df), or None when it has no deliveries."""
+    from_date, to_date, df, created_at = get_invoice_delivery_details(invoice_number)
+    if from_date is None or df.empty:
+        return None
+    return created_at.strftime("%d-%m-%Y"), prepare_invoice_df(df)
+
+
+def build_invoice_pdf(invoice_number, progress=None):
+    """Fetch, price and render one saved invoice. Returns None when it has no deliveries."""
+    loaded = load_invoice(invoice_number)
+    if loaded is None:
+        return None
+    invoice_date_str, df = loaded
+    return get_invoice_pdf(invoice_number, invoice_date_str, df, progress=progress)
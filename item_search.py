@@ -0,0 +1,80 @@
+"""
+Type-ahead search over the item catalog, for the DC entry item picker.
+
+Every item is indexed under each prefix of each word of its name and under runs of its words'
+initials, so "ss roo" finds "SS tag (Roopini)" and "sc" finds "Shalini Checks (6 Pc's)". A query
+matches the items that have every query word in their index. Matches are ranked with names that
+start with the query first, then by how often and how recently the item was used on DCs.
+
+The index is built once per process and rebuilt only when the catalog file changes.
+"""
+import re
+import threading
+from collections import defaultdict
+
+import catalog
+
+PICKER_RESULTS = 15
+
+_lock = threading.Lock()
+# (catalog version, {prefix: frozenset of item IDs})
+_index = None
+
+
+# ----------------- Index -----------------
+def _words(key):
+    return re.findall(r"[a-z0-9]+", key)
+
+
+def _build(current):
+    prefixes = defaultdict(set)
+    for item in current.items:
+        words = _words(item.key)
+        for word in words:
+            for end in range(1, len(word) + 1):
+                prefixes[word[:end]].add(item.id)
+        # Abbreviations: two or more consecutive initials, e.g. "sc" for "Shalini Checks"
+        initials = "".join(word[0] for word in words)
+        for start in range(len(initials)):
+            for end in range(start + 2, len(initials) + 1):
+                prefixes[initials[start:end]].add(item.id)
+    return {prefix: frozenset(ids) for prefix, ids in prefixes.items()}
+
+
+def _prefixes(current):
+    global _index
+    with _lock:
+        if _index is None or _index[0] != current.version:
+            _index = (current.version, _build(current))
+        return _index[1]
+
+
+# ----------------- Search -----------------
+def search(query, usage=None, limit=PICKER_RESULTS):
+    """
+    Item names matching query, best first, at most limit of them.
+
+    usage is {item: (times used, last used)} as returned by db.get_item_usage; with an empty
+    query the most used items come first, then the rest of the catalog in file order.
+    """
+    current = catalog.catalog()
+    key = catalog.normalize(query)
+    words = _words(key)
+    if words:
+        prefixes = _prefixes(current)
+        ids = frozenset.intersection(*(prefixes.get(word, frozenset()) for word in words))
+        matches = [item for item in current.items if item.id in ids]
+    else:
+        matches = list(current.items)
+
+    by_id = {}
+    for name, (uses, last_used) in (usage or {}).items():
+        item = catalog.lookup(name)
+        if item is not None:
+            by_id[item.id] = (uses, last_used or "")
+    # Stable sorts, least significant first; catalog order breaks the remaining ties
+    matches.sort(key=lambda item: by_id.get(item.id, (0, ""))[1], reverse=True)
+    matches.sort(key=lambda item: by_id.get(item.id, (0, ""))[0], reverse=True)
+    if key:
+        matches.sort(key=lambda item: not item.key.startswith(key))
+    return [item.name for item in matches[:limit]]
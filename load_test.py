@@ -0,0 +1,124 @@
+"""
+Write load test: simulated concurrent Streamlit sessions saving deliveries.
+
+Compares the old pattern (every call opens its own connection and commits, rollback journal)
+with the single writer thread in db.py (queue + group commit, WAL). Runs against a temporary
+database, never the real one.
+
+    python load_test.py --sessions 20 --writes 50
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date
+
+import db
+
+ITEM = "G 110"
+
+
+def seed(path, journal_mode, dc_count):
+    db.DB_FILE = path
+    db.init_db()
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    conn.executemany(
+        "INSERT INTO dc_entries (dc_entry_number, created_at) VALUES (?, ?)",
+        [(str(n), "2025-01-01T00:00:00") for n in range(dc_count)]
+    )
+    # Each DC allows exactly enough boxes for every session's writes to it
+    conn.executemany(
+        "INSERT INTO dc_rows (dc_entry_number, item, dozen, boxes) VALUES (?, ?, ?, ?)",
+        [(str(n), ITEM, 0, db.to_hundredths(1000.0)) for n in range(dc_count)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_add_delivery(path, dc_entry_number, boxes):
+    # The pre-queue db.py pattern: own connection, read-check-insert, commit
+    boxes = db.to_hundredths(boxes)
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute("SELECT boxes FROM dc_rows WHERE dc_entry_number = ? AND item = ?", (dc_entry_number, ITEM))
+    allowed = c.fetchone()[0]
+    c.execute("SELECT COALESCE(SUM(boxes), 0) FROM dc_delivery_details WHERE dc_entry_number = ? AND item = ?",
+              (dc_entry_number, ITEM))
+    delivered = c.fetchone()[0]
+    if delivered + boxes > allowed:
+        conn.close()
+        raise ValueError("over delivery")
+    c.execute("INSERT INTO dc_delivery_details (dc_entry_number, item, boxes, date) VALUES (?, ?, ?, ?)",
+              (dc_entry_number, ITEM, boxes, date.today().isoformat()))
+    conn.commit()
+    conn.close()
+
+
+def run(mode, sessions, writes, dc_count):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    seed(path, "DELETE" if mode == "direct" else "WAL", dc_count)
+
+    # Enough boxes requested in total that the last writers should be refused by the over-delivery check
+    boxes = 1000.0 * dc_count / (sessions * writes) * 1.5
+    stats = {"ok": 0, "locked": 0, "refused": 0, "other": 0}
+    lock = threading.Lock()
+
+    def count(key):
+        with lock:
+            stats[key] += 1
+
+    def session(n):
+        for i in range(writes):
+            dc = str((n + i) % dc_count)
+            try:
+                if mode == "direct":
+                    legacy_add_delivery(path, dc, boxes)
+                else:
+                    db.add_dc_delivery_details(dc, date.today(), ITEM, boxes).result()
+                count("ok")
+            except sqlite3.OperationalError as e:
+                count("locked" if "locked" in str(e) else "other")
+            except ValueError:
+                count("refused")
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    conn = sqlite3.connect(path)
+    over = conn.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT r.dc_entry_number FROM dc_rows r
+            JOIN dc_delivery_details d ON d.dc_entry_number = r.dc_entry_number AND d.item = r.item
+            GROUP BY r.dc_entry_number, r.boxes
+            HAVING SUM(d.boxes) > r.boxes
+        )
+    """).fetchone()[0]
+    conn.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    total = sessions * writes
+    print(f"{mode:>7} | {total / elapsed:8.0f} writes/s | ok {stats['ok']:5} | refused {stats['refused']:5} | "
+          f"locked {stats['locked']:4} ({100.0 * stats['locked'] / total:.1f}%) | other {stats['other']:3} | "
+          f"over-delivered DCs {over}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=50, help="writes per session")
+    parser.add_argument("--dcs", type=int, default=10)
+    args = parser.parse_args()
+
+    run("direct", args.sessions, args.writes, args.dcs)
+    run("queued", args.sessions, args.writes, args.dcs)
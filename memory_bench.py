@@ -0,0 +1,86 @@
+"""
+Memory benchmark: the statistics tab's frame for a year of deliveries.
+
+Compares the old reader (object strings, dates formatted as text, row-wise apply for pricing)
+with the compactly typed frame db.py returns now. Runs against a temporary database.
+
+    python memory_bench.py --deliveries 100000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import pandas as pd
+
+import catalog
+import db
+
+YEAR_START = date(2025, 4, 1)
+YEAR_END = date(2026, 3, 31)
+
+
+def seed(path, deliveries):
+    db.DB_FILE = path
+    db.init_db()
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO dc_delivery_details (dc_entry_number, item, boxes, date) VALUES (?, ?, ?, ?)",
+        ((str(1000 + n // 12), catalog.item_names()[n % len(catalog.item_names())], db.to_hundredths(float(n % 300) + 0.5),
+          (YEAR_START + timedelta(days=n % 365)).isoformat()) for n in range(deliveries))
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_tab8_frame():
+    # The pre-change reader and tab8 calculations
+    conn = sqlite3.connect(db.DB_FILE)
+    df = pd.read_sql_query(
+        "SELECT dc_entry_number, date, item, boxes FROM dc_delivery_details WHERE date BETWEEN ? AND ? ORDER BY date DESC",
+        conn, params=(YEAR_START.isoformat(), YEAR_END.isoformat())
+    )
+    conn.close()
+    df["boxes"] = (pd.to_numeric(df["boxes"], errors='coerce') / db.BOX_SCALE).round(2)
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime('%d-%m-%Y')
+    df["Packing Mode"] = df["item"].apply(lambda x: catalog.pieces_per_box(x))
+    df["Dozens"] = (df["boxes"] * df["Packing Mode"]) / 12
+    df["Amount"] = df.apply(lambda r: r["Dozens"] * catalog.rate_per_dozen(r["item"]), axis=1)
+    df_display = df[["date", "dc_entry_number", "item", "boxes", "Packing Mode", "Dozens", "Amount"]].copy()
+    return df, df_display
+
+
+def compact_tab8_frame():
+    # What tab8 does now
+    df = db.get_dc_delivery_details_with_date_filter(YEAR_START, YEAR_END)
+    pieces, rates = catalog.pricing(df["item"])
+    df["Packing Mode"] = pieces
+    df["Dozens"] = (df["boxes"] * df["Packing Mode"]) / 12
+    df["Amount"] = df["Dozens"] * rates
+    df_display = df[["date", "dc_entry_number", "item", "boxes", "Packing Mode", "Dozens", "Amount"]]
+    return df, df_display
+
+
+def measure(name, build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df, df_display = build()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    frame_mb = df.memory_usage(deep=True).sum() / 1e6
+    print(f"{name:>7} | frame {frame_mb:7.1f} MB | peak while building {peak / 1e6:7.1f} MB | {elapsed:5.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deliveries", type=int, default=100000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    seed(os.path.join(workdir, "bench.db"), args.deliveries)
+    measure("legacy", legacy_tab8_frame)
+    measure("compact", compact_tab8_frame)
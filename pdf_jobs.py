@@ -0,0 +1,73 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from invoice_pdf import build_invoice_pdf
+
+# Finished jobs are kept this long (seconds) so a rerun or another tab can still pick up the result
+JOB_TTL = 60 * 60
+
+# Module-level, so the pool and the job store are shared by every session and survive reruns
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-job")
+_jobs = {}
+_lock = threading.Lock()
+
+
+# ----------------- Worker -----------------
+def _update(job_id, **fields):
+    with _lock:
+        _jobs[job_id].update(fields)
+
+
+def _run_job(job_id, invoice_number):
+    _update(job_id, status="running")
+
+    def report(rows_done, total_rows):
+        _update(job_id, progress=rows_done / total_rows if total_rows else 1.0)
+
+    try:
+        pdf_bytes = build_invoice_pdf(invoice_number, progress=report)
+        if pdf_bytes is None:
+            _update(job_id, status="failed", error="No delivery records found for this invoice.",
+                    finished_at=time.time())
+        else:
+            _update(job_id, status="done", progress=1.0, result=pdf_bytes, finished_at=time.time())
+    except Exception as e:
+        _update(job_id, status="failed", error=str(e), finished_at=time.time())
+
+
+def _prune():
+    now = time.time()
+    for job_id in [j for j, job in _jobs.items()
+                   if job["finished_at"] is not None and now - job["finished_at"] > JOB_TTL]:
+        del _jobs[job_id]
+
+
+# ----------------- Job API -----------------
+def submit_pdf_job(invoice_number):
+    """Queue a PDF render for an invoice and return its job ID; reuses a job already in flight for it."""
+    with _lock:
+        _prune()
+        for job_id, job in _jobs.items():
+            if job["invoice_number"] == invoice_number and job["status"] in ("queued", "running"):
+                return job_id
+
+        job_id = uuid.uuid4().hex[:12]
+        _jobs[job_id] = {
+            "invoice_number": invoice_number,
+            "status": "queued",
+            "progress": 0.0,
+            "result": None,
+            "error": None,
+            "finished_at": None,
+        }
+    _executor.submit(_run_job, job_id, invoice_number)
+    return job_id
+
+
+def get_pdf_job(job_id):
+    """Return a snapshot of the job (status is queued, running, done or failed), or None if unknown."""
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job is not None else None
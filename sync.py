@@ -0,0 +1,218 @@
+"""
+Two-way sync between stations that each run the app on their own database file.
+
+Every DC and invoice write records the key in sync_changes with a rising sequence number, so a
+bundle carries only what changed since the peer last confirmed a sync: the current state of each
+changed DC (entry, rows and deliveries together) or invoice, or a tombstone if it was deleted.
+Bundles are gzipped JSON files, carried between PCs by hand or through a shared folder.
+
+A DC or invoice changed on both stations since they last synced is a conflict: the importing
+station keeps its version, reports the conflict, and its version goes back to the other station
+on the next sync. To take the incoming versions instead, import the same bundle again with --theirs.
+
+    python sync.py status                   this station's ID and what each peer has seen
+    python sync.py export <file> [--peer ID] write the changes the peer has not confirmed
+    python sync.py import <file> [--theirs]  apply a bundle from another station
+"""
+import argparse
+import gzip
+import json
+
+import db
+
+# 2: boxes travel as integer hundredths, as stored
+BUNDLE_FORMAT = 2
+
+
+# ----------------- Row State -----------------
+def _dc_state(conn, dc_entry_number):
+    source = db._dc_source(conn, dc_entry_number)
+    entry = conn.execute(f"SELECT created_at FROM {source}.dc_entries WHERE dc_entry_number = ?",
+                         (dc_entry_number,)).fetchone()
+    if entry is None:
+        return None
+    rows = conn.execute(f"SELECT item, dozen, boxes FROM {source}.dc_rows WHERE dc_entry_number = ?",
+                        (dc_entry_number,)).fetchall()
+    deliveries = conn.execute(f"SELECT item, boxes, date FROM {source}.dc_delivery_details WHERE dc_entry_number = ?",
+                              (dc_entry_number,)).fetchall()
+    return {
+        "created_at": entry[0],
+        "rows": sorted(list(r) for r in rows),
+        "deliveries": sorted(list(d) for d in deliveries),
+        "archived": source != "main",
+    }
+
+
+def _invoice_state(conn, invoice_number):
+    row = conn.execute("SELECT from_date, to_date, created_at FROM invoices WHERE invoice_number = ?",
+                       (invoice_number,)).fetchone()
+    if row is None:
+        return None
+    return {"from_date": row[0], "to_date": row[1], "created_at": row[2]}
+
+
+def _state(conn, kind, key):
+    return _dc_state(conn, key) if kind == "dc" else _invoice_state(conn, key)
+
+
+def _same(local, incoming):
+    # The archived flag is local bookkeeping, not part of the data
+    if local is None or incoming is None:
+        return local is incoming
+    return ({k: v for k, v in local.items() if k != "archived"}
+            == {k: v for k, v in incoming.items() if k != "archived"})
+
+
+# ----------------- Export -----------------
+def station_id(conn):
+    return conn.execute("SELECT value FROM sync_meta WHERE key = 'station_id'").fetchone()[0]
+
+
+def _peer(conn, peer_id):
+    row = conn.execute("SELECT peer_seq, acked_seq FROM sync_peers WHERE peer_id = ?", (peer_id,)).fetchone()
+    return row if row is not None else (0, 0)
+
+
+def export_bundle(path, peer_id=None):
+    """
+    Write every change peer_id has not confirmed to a bundle file (everything if the peer is
+    unknown). Returns the number of changes written.
+    """
+    with db.read_snapshot() as conn:
+        peer_seq, acked_seq = _peer(conn, peer_id)
+        changes = conn.execute(
+            "SELECT kind, key, seq FROM sync_changes WHERE seq > ? AND (origin IS NULL OR origin != ?) ORDER BY seq",
+            (acked_seq, peer_id or "")
+        ).fetchall()
+        bundle = {
+            "format": BUNDLE_FORMAT,
+            "station": station_id(conn),
+            "since": acked_seq,
+            "upto": conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sync_changes").fetchone()[0],
+            # How much of the peer's own history this station has applied; used for conflict checks
+            "peer_seq": peer_seq,
+            "changes": [{"kind": kind, "key": key, "seq": seq, "state": _state(conn, kind, key)}
+                        for kind, key, seq in changes],
+        }
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(bundle, f)
+    return len(bundle["changes"])
+
+
+# ----------------- Import -----------------
+@db._write_op("dc_entries", "dc_rows", "dc_delivery_details", "invoices")
+def _apply_bundle(c, bundle, theirs):
+    peer_id = bundle["station"]
+    if peer_id == station_id(c):
+        raise ValueError("This bundle was exported by this station.")
+    c.execute("INSERT OR IGNORE INTO sync_peers (peer_id) VALUES (?)", (peer_id,))
+    peer_seq, acked_seq = _peer(c, peer_id)
+    if bundle["since"] > peer_seq:
+        raise ValueError(f"Bundle starts after change {bundle['since']} but only {peer_seq} have been "
+                         f"applied from station {peer_id}; import the earlier bundle first.")
+
+    applied, conflicts = [], []
+    for change in bundle["changes"]:
+        kind, key, state = change["kind"], change["key"], change["state"]
+        local = c.execute("SELECT seq, origin FROM sync_changes WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        if change["seq"] <= peer_seq and (not theirs or (local is not None and local[1] == peer_id)):
+            # Already applied from an earlier bundle (re-importing with --theirs retakes the conflicts)
+            continue
+        # Archives cannot be attached inside the writer's transaction, so an archived DC is always a conflict
+        archived = kind == "dc" and c.execute("SELECT 1 FROM archived_dcs WHERE dc_entry_number = ?",
+                                              (key,)).fetchone() is not None
+        if not archived and _same(_state(c, kind, key), state):
+            continue
+        # Changed here since the peer last saw this station's changes, and not by the peer itself
+        changed_here = local is not None and local[1] != peer_id and local[0] > bundle["peer_seq"]
+        if changed_here or archived or change["seq"] <= peer_seq:
+            if not theirs:
+                conflicts.append((kind, key))
+                continue
+            # Logged as a local change so the winning version also goes back to the peer, which may
+            # have taken this station's version in the meantime
+            change = dict(change, origin=None)
+        else:
+            change = dict(change, origin=peer_id)
+        applied.append(change)
+
+    # Replace every accepted DC / invoice in one pass per table
+    dc_keys = [(ch["key"],) for ch in applied if ch["kind"] == "dc"]
+    # Delivery dates before and after, for the invoice totals they move
+    dates = [row[0] for key in dc_keys
+             for row in c.execute("SELECT DISTINCT date FROM dc_delivery_details WHERE dc_entry_number = ?", key)]
+    dates += [d[2] for ch in applied if ch["kind"] == "dc" and ch["state"] for d in ch["state"]["deliveries"]]
+    for table in ("dc_entries", "dc_rows", "dc_delivery_details"):
+        c.executemany(f"DELETE FROM {table} WHERE dc_entry_number = ?", dc_keys)
+    c.executemany("DELETE FROM archived_dcs WHERE dc_entry_number = ?", dc_keys)
+    c.executemany("INSERT INTO dc_entries (dc_entry_number, created_at) VALUES (?, ?)",
+                  [(ch["key"], ch["state"]["created_at"]) for ch in applied if ch["kind"] == "dc" and ch["state"]])
+    c.executemany("INSERT INTO dc_rows (dc_entry_number, item, dozen, boxes) VALUES (?, ?, ?, ?)",
+                  [(ch["key"], *row) for ch in applied if ch["kind"] == "dc" and ch["state"]
+                   for row in ch["state"]["rows"]])
+    c.executemany("INSERT INTO dc_delivery_details (dc_entry_number, item, boxes, date) VALUES (?, ?, ?, ?)",
+                  [(ch["key"], *d) for ch in applied if ch["kind"] == "dc" and ch["state"]
+                   for d in ch["state"]["deliveries"]])
+    c.executemany("DELETE FROM invoices WHERE invoice_number = ?",
+                  [(ch["key"],) for ch in applied if ch["kind"] == "invoice"])
+    c.executemany("INSERT INTO invoices (invoice_number, from_date, to_date, created_at) VALUES (?, ?, ?, ?)",
+                  [(ch["key"], ch["state"]["from_date"], ch["state"]["to_date"], ch["state"]["created_at"])
+                   for ch in applied if ch["kind"] == "invoice" and ch["state"]])
+    db._refresh_invoice_totals(c, set(db._invoices_covering(c, dates))
+                               | {ch["key"] for ch in applied if ch["kind"] == "invoice" and ch["state"]})
+    for ch in applied:
+        db._log_change(c, ch["kind"], ch["key"], origin=ch["origin"])
+
+    c.execute("UPDATE sync_peers SET peer_seq = MAX(peer_seq, ?), acked_seq = MAX(acked_seq, ?) WHERE peer_id = ?",
+              (bundle["upto"], bundle["peer_seq"], peer_id))
+    return len(applied), conflicts
+
+
+def import_bundle(path, theirs=False):
+    """
+    Apply a bundle from another station in a single transaction.
+
+    Returns (number of DCs / invoices applied, [(kind, key), ...] conflicts kept at the local version).
+    With theirs=True, conflicts take the incoming version instead.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        bundle = json.load(f)
+    if bundle.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported sync bundle format: {bundle.get('format')}")
+    return _apply_bundle(bundle, theirs).result()
+
+
+def sync_status():
+    """Return (this station's ID, [(peer_id, peer_seq, acked_seq), ...], pending local changes)."""
+    with db.read_snapshot() as conn:
+        peers = conn.execute("SELECT peer_id, peer_seq, acked_seq FROM sync_peers ORDER BY peer_id").fetchall()
+        latest = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sync_changes").fetchone()[0]
+        return station_id(conn), peers, latest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status")
+    export_parser = sub.add_parser("export")
+    export_parser.add_argument("bundle")
+    export_parser.add_argument("--peer", help="station ID of the receiving PC (see status)")
+    import_parser = sub.add_parser("import")
+    import_parser.add_argument("bundle")
+    import_parser.add_argument("--theirs", action="store_true", help="take the incoming version on conflicts")
+    args = parser.parse_args()
+
+    db.init_db()
+    if args.command == "status":
+        station, peers, latest = sync_status()
+        print(f"station {station}, latest change {latest}")
+        for peer_id, peer_seq, acked_seq in peers:
+            print(f"peer {peer_id}: applied its changes up to {peer_seq}, it has confirmed ours up to {acked_seq}")
+    elif args.command == "export":
+        count = export_bundle(args.bundle, args.peer)
+        print(f"Wrote {count} changes to {args.bundle}")
+    else:
+        applied, conflicts = import_bundle(args.bundle, args.theirs)
+        print(f"Applied {applied} changes")
+        for kind, key in conflicts:
+            print(f"Conflict, kept the local version: {kind} {key}")